@@ -1,8 +1,31 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, NamedTuple, Optional, Union
+
 import requests
-from typing import Iterable, List, Union
+from requests.adapters import HTTPAdapter
+
+from metrics import PUSH_DURATION, PUSH_RESULTS, mask_device
+from notifier import Notifier
+
+
+class DeliveryResult(NamedTuple):
+    device_key: str
+    ok: bool
+    status_code: Optional[int]
+    latency_ms: float
+    error: str = ""
+
+
+class BarkClient(Notifier):
+    """
+    Bark 推送客户端：复用同一个 requests.Session 保持长连接，
+    多个设备并发推送，整体耗时约等于最慢的一台设备。
+    """
 
+    name = "bark"
 
-class BarkClient:
     def __init__(
         self,
         base_url: str,
@@ -10,17 +33,36 @@ class BarkClient:
         group: str = "",
         sound: str = "",
         icon: str = "",
+        timeout: float = 10,
+        max_workers: int = 16,
     ):
         self.base_url = base_url.rstrip("/")
         self.device_keys = self._normalize_keys(device_key)
         self.group = group
         self.sound = sound
         self.icon = icon
+        self.timeout = timeout
+        self.max_workers = max(1, min(int(max_workers), len(self.device_keys) or 1))
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
 
     def send(self, title: str, body: str, url: str = "", group: str = None) -> bool:
+        """任意一台设备推送成功即视为成功。"""
+        return any(result.ok for result in self.send_all(title, body, url, group))
+
+    def send_all(self, title: str, body: str, url: str = "", group: str = None) -> List[DeliveryResult]:
+        """
+        向全部设备并发推送
+        :return: 按 device_keys 顺序排列的每台设备推送结果
+        """
         if not self.device_keys:
             print("Bark device keys missing, notification skipped")
-            return False
+            return []
 
         payload = {
             "title": title,
@@ -37,21 +79,49 @@ class BarkClient:
         if self.icon:
             payload["icon"] = self.icon
 
-        results = []
-        for key in self.device_keys:
-            try:
-                endpoint = f"{self.base_url}/{key}/"
-                response = requests.post(endpoint, json=payload, timeout=10)
-                if response.status_code // 100 == 2:
-                    results.append(True)
-                else:
-                    print(f"Bark push failed ({key}): {response.status_code} {response.text}")
-                    results.append(False)
-            except Exception as exc:
-                print(f"Bark push exception ({key}): {exc}")
-                results.append(False)
-
-        return any(results)
+        if len(self.device_keys) == 1:
+            return [self._post(self.device_keys[0], payload)]
+        executor = self._get_executor()
+        futures = [executor.submit(self._post, key, payload) for key in self.device_keys]
+        return [future.result() for future in futures]
+
+    def close(self):
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+        self.session.close()
+
+    def _post(self, key: str, payload: dict) -> DeliveryResult:
+        result = self._do_post(key, payload)
+        device = mask_device(key)
+        PUSH_DURATION.observe(result.latency_ms / 1000, channel=self.name, device=device)
+        PUSH_RESULTS.inc(channel=self.name, device=device, result="success" if result.ok else "failure")
+        return result
+
+    def _do_post(self, key: str, payload: dict) -> DeliveryResult:
+        endpoint = f"{self.base_url}/{key}/"
+        started = time.perf_counter()
+        try:
+            response = self.session.post(endpoint, json=payload, timeout=self.timeout)
+        except Exception as exc:
+            latency_ms = (time.perf_counter() - started) * 1000
+            print(f"Bark push exception ({key}): {exc}")
+            return DeliveryResult(key, False, None, latency_ms, str(exc))
+        latency_ms = (time.perf_counter() - started) * 1000
+        if response.status_code // 100 == 2:
+            return DeliveryResult(key, True, response.status_code, latency_ms)
+        print(f"Bark push failed ({key}): {response.status_code} {response.text}")
+        return DeliveryResult(key, False, response.status_code, latency_ms, response.text[:200])
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="bark-push",
+                )
+            return self._executor
 
     def _normalize_keys(self, keys: Union[str, Iterable[str]]) -> List[str]:
         if isinstance(keys, str):
@@ -0,0 +1,58 @@
+"""
+关键词匹配微基准：对比逐个关键词子串查找与 KeywordMatcher（Aho-Corasick）
+在不同关键词数量下的单条笔记匹配耗时。
+
+    python benchmarks/bench_matcher.py [--sizes 10,100,1000,5000] [--rounds 2000]
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from matcher import KeywordMatcher, TextNormalizer  # noqa: E402
+
+SAMPLE_TEXT = "今天是我的生日，关键词12号出现了，分享一下日常穿搭\n#穿搭 #生日 #OOTD"
+
+
+def make_keywords(count: int):
+    return [f"关键词{i}号" for i in range(count)]
+
+
+def legacy_match(keywords, text):
+    return [kw for kw in keywords if kw and kw in text]
+
+
+def measure(func, rounds: int) -> float:
+    started = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    return (time.perf_counter() - started) / rounds * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10,100,1000,5000", help="关键词数量，逗号分隔")
+    parser.add_argument("--rounds", type=int, default=2000, help="重复次数")
+    args = parser.parse_args()
+
+    results = []
+    for size in [int(value) for value in args.sizes.split(",") if value]:
+        keywords = make_keywords(size)
+        matcher = KeywordMatcher(TextNormalizer())
+        matcher.add_many(keywords, "bench")
+        matcher.match(SAMPLE_TEXT, "bench")
+        legacy = measure(lambda: legacy_match(keywords, SAMPLE_TEXT), max(1, args.rounds // 10))
+        compiled = measure(lambda: matcher.match(SAMPLE_TEXT, "bench"), args.rounds)
+        results.append({
+            "keywords": size,
+            "legacy_us_per_note": round(legacy, 3),
+            "matcher_us_per_note": round(compiled, 3),
+        })
+    print(json.dumps(results, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
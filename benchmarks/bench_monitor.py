@@ -0,0 +1,380 @@
+"""
+端到端离线基准：用合成的监控对象与笔记列表驱动 XHSMonitor，完全不访问网络。
+
+- 假的 XhsClient：按轮次生成笔记列表，部分对象出现新笔记、点赞数持续增长；
+- 假的签名服务：每次签名固定延迟（--sign-latency），模拟 Playwright 签名耗时；
+- 本地 HTTP 服务代替 Bark：可设置响应延迟（--bark-latency），记录每条推送到达时间；
+- 合成的 config 模块在导入 monitor 前注入，数据库与日志写到临时目录。
+
+每个规模在独立子进程中运行，峰值 RSS 互不影响。输出 JSON，便于不同提交之间对比：
+
+    python benchmarks/bench_monitor.py [--sizes 10,100,1000,5000] [--cycles 5] [--output result.json]
+
+第 0 轮为首次运行（全部笔记入库），单独记为 cold，其余轮次汇总为 steady。
+"""
+import argparse
+import json
+import os
+import re
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import types
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+NOTE_ID_PATTERN = re.compile(r"/explore/([\w-]+)")
+KEYWORD = "生日"
+
+
+class FakeSigner:
+    """与 XhsSigner 接口一致，签名只睡眠固定时间。"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.sign_count = 0
+        self._lock = threading.Lock()
+
+    def sign(self, uri, data=None, a1: str = "", web_session: str = "") -> Dict[str, str]:
+        time.sleep(self.latency)
+        with self._lock:
+            self.sign_count += 1
+        return {"x-s": "bench", "x-t": str(int(time.time() * 1000))}
+
+    async def sign_async(self, uri, data=None, a1: str = "", web_session: str = "") -> Dict[str, str]:
+        return self.sign(uri, data, a1, web_session)
+
+    def warm_up(self, a1: str = "", web_session: str = "", timeout=None):
+        pass
+
+    def stats(self) -> Dict[str, float]:
+        return {"sign_count": self.sign_count}
+
+    def close(self):
+        pass
+
+
+class NoteFeed:
+    """
+    每个对象的合成笔记列表。advance() 进入下一轮：按 new_ratio 给部分对象发一条新笔记，
+    命中关键词的比例为 hit_ratio；列表中所有笔记的点赞数每轮增长。
+    """
+
+    def __init__(self, user_ids: List[str], page_size: int, new_ratio: float, hit_ratio: float):
+        self.page_size = page_size
+        self.new_ratio = new_ratio
+        self.hit_ratio = hit_ratio
+        self.cycle = 0
+        self.pages: Dict[str, List[dict]] = {}
+        # note_id -> 该笔记第一次出现在接口返回中的时间，用于计算推送延迟
+        self.first_served: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        now = int(time.time())
+        for index, user_id in enumerate(user_ids):
+            self.pages[user_id] = [
+                self._note(user_id, f"{user_id}-h{seq}", now - (seq + 1) * 86400, index + seq)
+                for seq in range(page_size)
+            ]
+
+    def advance(self):
+        self.cycle += 1
+        now = int(time.time())
+        for index, (user_id, page) in enumerate(self.pages.items()):
+            for note in page:
+                likes = int(note["interact_info"]["liked_count"])
+                note["interact_info"]["liked_count"] = str(likes + 1 + index % 7)
+            if self._fraction(index, self.cycle, 101) < self.new_ratio:
+                note = self._note(user_id, f"{user_id}-c{self.cycle}", now, index)
+                page.insert(0, note)
+                del page[self.page_size:]
+
+    def get_page(self, user_id: str) -> List[dict]:
+        page = [dict(note, interact_info=dict(note["interact_info"])) for note in self.pages[user_id]]
+        now = time.perf_counter()
+        with self._lock:
+            for note in page:
+                self.first_served.setdefault(note["note_id"], now)
+        return page
+
+    def _note(self, user_id: str, note_id: str, published_ts: int, seed: int) -> dict:
+        hit = self._fraction(seed, self.cycle, 103) < self.hit_ratio
+        title = f"{KEYWORD}快乐 · 第 {self.cycle} 轮" if hit else f"日常分享 · 第 {self.cycle} 轮"
+        return {
+            "note_id": note_id,
+            "display_title": title,
+            "type": "normal",
+            "user": {"user_id": user_id},
+            "interact_info": {"liked_count": str(seed % 50)},
+            "time": published_ts * 1000,
+        }
+
+    @staticmethod
+    def _fraction(index: int, cycle: int, salt: int) -> float:
+        # 确定性的伪随机，同样的参数每次运行得到同样的数据
+        return ((index * 2654435761 + cycle * 40503 + salt) % 1000) / 1000
+
+
+def make_client_class(feed: NoteFeed):
+    class FakeXhsClient:
+        def __init__(self, cookie=None, sign=None, **kwargs):
+            self.sign = sign
+
+        def get_user_notes(self, user_id: str, cursor: str = "") -> dict:
+            if self.sign is not None:
+                self.sign(f"/api/sns/web/v1/user_posted?user_id={user_id}")
+            return {"notes": feed.get_page(user_id), "has_more": False}
+
+    return FakeXhsClient
+
+
+class BarkStandIn:
+    """本地 HTTP 服务代替 Bark，记录每条推送的到达时间。"""
+
+    def __init__(self, latency: float):
+        self.arrivals: List[tuple] = []
+        self._lock = threading.Lock()
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                if latency > 0:
+                    time.sleep(latency)
+                with stand_in._lock:
+                    stand_in.arrivals.append((time.perf_counter(), payload))
+                body = b'{"code":200,"message":"success"}'
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, name="bark-stand-in", daemon=True)
+        self.thread.start()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def count(self) -> int:
+        with self._lock:
+            return len(self.arrivals)
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def install_config(args, bark_url: str, workdir: str):
+    """在导入 monitor 前注入合成的 config 模块。"""
+    config = types.ModuleType("config")
+    config.XHS_CONFIG = {"COOKIE": "a1=bench; web_session=bench"}
+    config.MONITOR_TARGETS = [
+        {"nickname": f"bench{i}", "id": f"u{i}", "keyword": [KEYWORD, "穿搭", {"all": ["旅行", "攻略"]}], "hot_gate": 500}
+        for i in range(args.targets)
+    ]
+    config.MONITOR_CONFIG = {
+        "CHECK_INTERVAL": 1800,
+        "POLL_CONCURRENCY": args.concurrency,
+        "PER_HOST_CONCURRENCY": args.concurrency,
+        "REQUEST_RATE_LIMIT": 0,
+        "FETCH_BACKEND": "sync",
+        "NOTIFY_COALESCE_WINDOW": args.coalesce_window,
+        "HOT_GATE_REFRESH_HOURS": 0,
+        "LOG_DIR": os.path.join(workdir, "logs"),
+        "LOG_LEVEL": "WARNING",
+    }
+    config.BARK_CONFIG = {"BASE_URL": bark_url, "DEVICE_KEY": ["benchdevice"], "TIMEOUT": 10}
+    config.WECOM_CONFIG = {"ENABLED": False}
+    sys.modules["config"] = config
+    return config
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def summarize(samples: List[Dict]) -> Dict:
+    if not samples:
+        return {}
+    keys = samples[0].keys()
+    return {key: round(statistics.mean(sample[key] for sample in samples), 3) for key in keys}
+
+
+def run_worker(args) -> Dict:
+    workdir = tempfile.mkdtemp(prefix="xhs-bench-")
+    os.chdir(workdir)
+    sys.path.insert(0, str(ROOT))
+    bark = BarkStandIn(args.bark_latency / 1000)
+    install_config(args, bark.base_url, workdir)
+
+    import monitor  # noqa: E402
+
+    user_ids = [f"u{i}" for i in range(args.targets)]
+    feed = NoteFeed(user_ids, args.page_size, args.new_ratio, args.hit_ratio)
+    signer = FakeSigner(args.sign_latency / 1000)
+    monitor.XhsClient = make_client_class(feed)
+    monitor.get_signer = lambda pool_size=None: signer
+
+    xhs_monitor = monitor.XHSMonitor(monitor.XHS_CONFIG["COOKIE"], monitor.MONITOR_TARGETS)
+    xhs_monitor.outbox.start()
+    targets = list(xhs_monitor.targets_by_id.values())
+
+    cycles = []
+    try:
+        for cycle in range(args.cycles):
+            if cycle:
+                feed.advance()
+            db_before = xhs_monitor.db.stats()
+            cpu_before = time.process_time()
+            started = time.perf_counter()
+            new_counts = xhs_monitor.poll_targets(targets)
+            xhs_monitor._reschedule(targets, new_counts)
+            elapsed = time.perf_counter() - started
+            cpu = time.process_time() - cpu_before
+            db_after = xhs_monitor.db.stats()
+            notes = len(targets) * args.page_size
+            cycles.append({
+                "cycle_s": elapsed,
+                "cpu_s": cpu,
+                "cpu_us_per_note": cpu / notes * 1e6,
+                "new_notes": sum(new_counts.values()),
+                "db_statements": db_after["statements"] - db_before["statements"],
+                "db_commits": db_after["commits"] - db_before["commits"],
+                "db_time_ms": db_after["statement_time_ms"] - db_before["statement_time_ms"],
+            })
+        drained = wait_for_outbox(xhs_monitor, args.drain_timeout)
+    finally:
+        xhs_monitor.outbox.stop()
+        xhs_monitor.executor.shutdown(wait=True)
+        bark.close()
+        outbox_stats = xhs_monitor.outbox.stats()
+        xhs_monitor.db.close()
+        os.chdir(ROOT)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    latencies = []
+    for arrived, payload in bark.arrivals:
+        match = NOTE_ID_PATTERN.search(payload.get("url", ""))
+        served = feed.first_served.get(match.group(1)) if match else None
+        if served is not None:
+            latencies.append((arrived - served) * 1000)
+
+    peak_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        peak_rss_kb //= 1024
+    return {
+        "targets": args.targets,
+        "cold": summarize(cycles[:1]),
+        "steady": summarize(cycles[1:]),
+        "pushes": bark.count(),
+        "outbox_drained": drained,
+        "outbox": outbox_stats,
+        "push_latency_ms": {
+            "p50": round(percentile(latencies, 0.5), 2),
+            "p95": round(percentile(latencies, 0.95), 2),
+            "max": round(max(latencies, default=0.0), 2),
+        },
+        "peak_rss_mb": round(peak_rss_kb / 1024, 1),
+    }
+
+
+def wait_for_outbox(xhs_monitor, timeout: float) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if not xhs_monitor.db.get_outbox_counts().get("pending", 0):
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except Exception:
+        return ""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10,100,1000,5000", help="监控对象数量，逗号分隔")
+    parser.add_argument("--cycles", type=int, default=5, help="每个规模运行的轮数（含首次运行）")
+    parser.add_argument("--page-size", type=int, default=30, help="每个对象的笔记列表长度")
+    parser.add_argument("--new-ratio", type=float, default=0.2, help="每轮出现新笔记的对象比例")
+    parser.add_argument("--hit-ratio", type=float, default=0.3, help="笔记命中关键词的比例")
+    parser.add_argument("--concurrency", type=int, default=4, help="POLL_CONCURRENCY")
+    parser.add_argument("--sign-latency", type=float, default=20, help="签名延迟（毫秒）")
+    parser.add_argument("--bark-latency", type=float, default=5, help="Bark 响应延迟（毫秒）")
+    parser.add_argument("--coalesce-window", type=float, default=0, help="NOTIFY_COALESCE_WINDOW，默认关闭合并")
+    parser.add_argument("--drain-timeout", type=float, default=120, help="等待发件箱投递完成的最长秒数")
+    parser.add_argument("--output", help="结果 JSON 写入的文件，默认只打印")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--targets", type=int, default=10, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args), ensure_ascii=False))
+        return
+
+    passthrough = [
+        f"--cycles={args.cycles}",
+        f"--page-size={args.page_size}",
+        f"--new-ratio={args.new_ratio}",
+        f"--hit-ratio={args.hit_ratio}",
+        f"--concurrency={args.concurrency}",
+        f"--sign-latency={args.sign_latency}",
+        f"--bark-latency={args.bark_latency}",
+        f"--coalesce-window={args.coalesce_window}",
+        f"--drain-timeout={args.drain_timeout}",
+    ]
+    results = []
+    for size in [int(value) for value in args.sizes.split(",") if value]:
+        completed = subprocess.run(
+            [sys.executable, __file__, "--worker", f"--targets={size}", *passthrough],
+            capture_output=True,
+            text=True,
+        )
+        if completed.returncode != 0:
+            sys.stderr.write(completed.stderr)
+            raise SystemExit(f"规模 {size} 运行失败")
+        results.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+        print(f"targets={size} 完成", file=sys.stderr)
+
+    report = {
+        "revision": git_revision(),
+        "python": sys.version.split()[0],
+        "params": {key: value for key, value in vars(args).items() if key not in ("worker", "targets", "output")},
+        "results": results,
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
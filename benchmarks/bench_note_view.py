@@ -0,0 +1,135 @@
+"""
+笔记预处理微基准：对比旧流程（json 深拷贝 + 排序和解析时重复提取时间戳 + 重复查找点赞字段）
+与 NoteView 一次解析的单条笔记耗时。
+
+    python benchmarks/bench_note_view.py [--notes 30] [--rounds 2000]
+"""
+import argparse
+import json
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from note_view import NoteView  # noqa: E402
+
+
+def make_page(count: int):
+    now_ms = int(time.time() * 1000)
+    return [
+        {
+            "note_id": f"{i:024x}",
+            "display_title": f"测试笔记 {i}",
+            "type": "normal",
+            "user": {"user_id": "5c9cd8ca000000001202cba7", "nickname": "bench"},
+            "interact_info": {"liked": False, "liked_count": f"{i * 0.37:.1f}万" if i % 3 else str(i * 17)},
+            "cover": {"url": "https://example.invalid/cover.jpg", "width": 1080, "height": 1440},
+            "time": str(now_ms - i * 3_600_000),
+        }
+        for i in range(count)
+    ]
+
+
+# ---- 改动前 monitor.py 中的逐条处理逻辑，仅作对照 ----
+
+def _legacy_extract_timestamp(note):
+    value = note.get('time') or note.get('timestamp')
+    if not value:
+        card = note.get('note_card') or {}
+        value = card.get('time') or card.get('timestamp')
+    if isinstance(value, str):
+        cleaned = value.strip()
+        if cleaned.isdigit():
+            return int(cleaned)
+        if cleaned.endswith('Z'):
+            cleaned = cleaned[:-1] + '+00:00'
+        try:
+            return int(datetime.fromisoformat(cleaned).timestamp())
+        except Exception:
+            pass
+    if isinstance(value, (int, float)):
+        return int(value)
+    return None
+
+
+def _legacy_extract_datetime(note):
+    ts = _legacy_extract_timestamp(note)
+    if ts:
+        try:
+            return datetime.fromtimestamp(ts, tz=timezone.utc)
+        except Exception:
+            return None
+    return None
+
+
+def _legacy_like(note):
+    value = note.get('liked_count')
+    if value is None:
+        value = (note.get('note_card') or {}).get('liked_count')
+    if value is None:
+        value = (note.get('interact_info') or {}).get('liked_count')
+    if isinstance(value, str):
+        text = value.strip().lower().replace(',', '')
+        multiplier = 1
+        if text.endswith('万'):
+            multiplier = 10000
+            text = text[:-1]
+        try:
+            return int(float(text) * multiplier)
+        except Exception:
+            return 0
+    return int(value or 0)
+
+
+def legacy_pipeline(notes):
+    notes = sorted(notes, key=lambda x: _legacy_extract_timestamp(x) or 0)
+    records = []
+    for note in notes:
+        published_at = _legacy_extract_datetime(note) or datetime.now(timezone.utc)
+        record = json.loads(json.dumps(note))
+        record["published_time"] = published_at.astimezone(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+        like_count = _legacy_like(note)
+        raw_like = note.get('liked_count')
+        if raw_like is None:
+            raw_like = (note.get('note_card') or {}).get('liked_count')
+        if raw_like is None:
+            raw_like = (note.get('interact_info') or {}).get('liked_count')
+        records.append((record, like_count, raw_like))
+    return records
+
+
+def view_pipeline(notes):
+    views = [NoteView.from_raw(note) for note in notes]
+    views.sort(key=lambda view: view.published_ts or 0)
+    return views
+
+
+def measure(func, page, rounds: int) -> float:
+    started = time.perf_counter()
+    for _ in range(rounds):
+        func(page)
+    return (time.perf_counter() - started) / (rounds * len(page)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--notes", type=int, default=30, help="每页笔记数量")
+    parser.add_argument("--rounds", type=int, default=2000, help="重复次数")
+    args = parser.parse_args()
+
+    page = make_page(args.notes)
+    legacy = measure(legacy_pipeline, page, args.rounds)
+    view = measure(view_pipeline, page, args.rounds)
+    print(json.dumps({
+        "notes_per_page": args.notes,
+        "rounds": args.rounds,
+        "legacy_us_per_note": round(legacy, 3),
+        "note_view_us_per_note": round(view, 3),
+        "speedup": round(legacy / view, 2) if view else None,
+    }, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+import asyncio
+import random
+import threading
+import time
+from typing import Optional
+
+import aiohttp
+import requests
+from xhs.exception import DataFetchError, IPBlockError, NeedVerifyError, SignError
+
+from signer import SignatureUnavailable
+
+SIGN_FAILURE = "sign"
+RATE_LIMITED = "rate_limit"
+COOKIE_EXPIRED = "cookie"
+NETWORK_ERROR = "network"
+UNKNOWN_ERROR = "unknown"
+
+# 小红书接口返回的错误码
+SESSION_EXPIRED_CODES = {-100, -101}
+RATE_LIMIT_CODES = {300012, 300013}
+
+
+def classify_error(exc: BaseException) -> str:
+    """把拉取失败归类为签名失败、限流、Cookie 失效、网络异常或未知错误。"""
+    if isinstance(exc, (SignError, SignatureUnavailable)):
+        return SIGN_FAILURE
+    if isinstance(exc, (IPBlockError, NeedVerifyError)):
+        return RATE_LIMITED
+    if isinstance(exc, DataFetchError):
+        data = exc.args[0] if exc.args else None
+        if isinstance(data, dict):
+            code = data.get("code")
+            if code in SESSION_EXPIRED_CODES or "登录" in str(data.get("msg", "")):
+                return COOKIE_EXPIRED
+            if code in RATE_LIMIT_CODES:
+                return RATE_LIMITED
+        return UNKNOWN_ERROR
+    if isinstance(
+        exc,
+        (
+            requests.ConnectionError,
+            requests.Timeout,
+            aiohttp.ClientError,
+            asyncio.TimeoutError,
+            ConnectionError,
+            TimeoutError,
+        ),
+    ):
+        return NETWORK_ERROR
+    return UNKNOWN_ERROR
+
+
+class CircuitBreaker:
+    """
+    熔断器：连续失败达到阈值后打开，按带抖动的指数退避冷却；冷却结束后放行一次探测请求
+    （半开），探测成功则关闭，失败则以更长的退避时间重新打开。
+
+    每次状态切换都会增加 generation。admit() 返回放行时的 generation，结果回报时一并带上：
+    状态切换前放行、之后才返回的请求（例如打开时仍在途的并发请求）只记录错误类型，
+    不会叠加退避，也不会把刚打开的熔断器关闭。
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int, base_delay: float, max_delay: float):
+        self.name = name
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.base_delay = max(0.0, float(base_delay))
+        self.max_delay = max(self.base_delay, float(max_delay))
+        self.state = self.CLOSED
+        self.generation = 0
+        self.failures = 0
+        self.open_count = 0
+        self.retry_at = 0.0
+        self.last_kind = None
+        self._lock = threading.Lock()
+
+    def admit(self, now: float = None) -> Optional[int]:
+        """
+        :return: 允许请求时返回当前 generation，冷却中或半开探测未结束时返回 None
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            if self.state == self.CLOSED:
+                return self.generation
+            if self.state == self.OPEN and now >= self.retry_at:
+                self._transition(self.HALF_OPEN)
+                return self.generation
+            return None
+
+    def allow(self, now: float = None) -> bool:
+        return self.admit(now) is not None
+
+    def release(self, generation: int):
+        """放行后没有真正发出请求时调用，让半开的熔断器重新等待探测，避免一直卡在半开。"""
+        with self._lock:
+            if self.state == self.HALF_OPEN and generation == self.generation:
+                self._transition(self.OPEN)
+
+    def record_success(self, generation: Optional[int] = None) -> bool:
+        """
+        :param generation: admit() 返回的值；与当前不一致说明是状态切换前放行的请求，忽略
+        :return: 熔断器是否因此从半开恢复为关闭
+        """
+        with self._lock:
+            if self.state == self.OPEN or (generation is not None and generation != self.generation):
+                return False
+            recovered = self.state != self.CLOSED
+            if recovered:
+                self._transition(self.CLOSED)
+            self.failures = 0
+            self.open_count = 0
+            self.retry_at = 0.0
+            self.last_kind = None
+            return recovered
+
+    def record_failure(
+        self,
+        kind: str,
+        now: float = None,
+        force_open: bool = False,
+        generation: Optional[int] = None,
+    ) -> bool:
+        """
+        :param force_open: 不等连续失败次数达到阈值，直接打开
+        :param generation: admit() 返回的值；过期的结果只记录错误类型
+        :return: 本次失败是否让熔断器从关闭变为打开
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            self.last_kind = kind
+            if self.state == self.OPEN or (generation is not None and generation != self.generation):
+                return False
+            self.failures += 1
+            was_closed = self.state == self.CLOSED
+            if self.state == self.HALF_OPEN or force_open or self.failures >= self.failure_threshold:
+                self.open_count += 1
+                delay = min(self.max_delay, self.base_delay * (2 ** (self.open_count - 1)))
+                # 抖动避免多个对象在同一时刻集中重试
+                self.retry_at = now + random.uniform(delay / 2, delay)
+                self._transition(self.OPEN)
+                return was_closed
+            return False
+
+    def _transition(self, state: str):
+        self.state = state
+        self.generation += 1
+
+    def cooldown_remaining(self, now: float = None) -> float:
+        now = time.time() if now is None else now
+        with self._lock:
+            if self.state == self.CLOSED:
+                return 0.0
+            return max(0.0, self.retry_at - now)
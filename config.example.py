@@ -33,19 +33,53 @@ MONITOR_TARGETS = [
     {
         "nickname": "恋与深空",
         "id": "5c9cd8ca000000001202cba7",
-        "keyword": ["思念", "生日"],
+        # 字符串为普通关键词；dict 为组合规则：any 任一命中、all 全部命中、not 命中即排除、
+        # regex 正则、group 推送分组（默认「重要更新提醒」）
+        "keyword": [
+            "思念",
+            "生日",
+            {"all": ["限定", "上线"], "not": ["转发"], "group": "活动提醒"},
+            {"regex": r"第\d+期", "not": ["预告"]},
+        ],
+        "exclude": ["广告"],  # 可选，对该对象的所有关键词生效
         "hot_gate": 40000,
     },
 ]
 
 # 监控配置
 MONITOR_CONFIG = {
-    "CHECK_INTERVAL": 1800,  # 轮询频率，单位秒
-    "ERROR_COUNT": 10,  # 连续错误次数阈值
-    "ERROR_RETRY_WAIT": 60,  # API 调用失败后的等待时间（秒）
+    "CHECK_INTERVAL": 1800,  # 轮询频率，单位秒；开启自适应调度时为日均发帖 1 条账号的基准间隔
+    "ADAPTIVE_SCHEDULE": True,  # 按账号发帖频率和活跃时段自动调整轮询间隔
+    "MIN_CHECK_INTERVAL": 300,  # 自适应调度的最短轮询间隔（秒）
+    "MAX_CHECK_INTERVAL": 7200,  # 自适应调度的最长轮询间隔（秒），长期不发帖的账号退避到此值
+    "SCHEDULE_HISTORY_DAYS": 30,  # 学习发帖习惯时参考的历史天数
+    "ERROR_COUNT": 10,  # 跨对象连续错误达到该次数后全局熔断并告警
+    "ERROR_RETRY_WAIT": 60,  # 失败后的初始退避时间（秒），连续失败按指数翻倍
+    "ERROR_BACKOFF_MAX": 3600,  # 退避时间上限（秒）
+    "OUTBOX_MAX_ATTEMPTS": 10,  # 单条推送最多尝试次数，之后标记为 failed
+    "OUTBOX_RETRY_WAIT": 30,  # 推送失败后的初始重试间隔（秒），按指数翻倍，最长 1 小时
+    "OUTBOX_RETENTION_DAYS": 7,  # 已送达推送记录的保留天数
+    "NOTIFY_COALESCE_WINDOW": 60,  # 同一对象同一分组两次推送的最小间隔（秒），期间到达的提醒顺延合并；0 表示关闭
+    "NOTIFY_COALESCE_THRESHOLD": 3,  # 待推送提醒达到该条数时合并为一条汇总推送
     "HOT_GATE_DAYS": 5,  # 点赞达标检查的时间窗口（天）
+    "HOT_GATE_REFRESH_HOURS": 24,  # 点赞达标补充检查间隔（小时），0 表示关闭
     "FIRST_RUN_WINDOW_HOURS": 24,  # 初次运行仅关注最近24小时笔记
+    "SIGN_POOL_SIZE": 2,  # 常驻签名浏览器中预热的页面数量，可并发签名
+    "POLL_CONCURRENCY": 4,  # 同时拉取的监控对象数量，1 表示逐个拉取
+    "FETCH_BACKEND": "sync",  # 拉取方式：sync 使用 xhs 库 + 线程池；aiohttp 在单个事件循环中并发拉取，适合监控对象很多时
+    "PER_HOST_CONCURRENCY": 4,  # 同一接口域名同时进行的请求上限
+    "REQUEST_RATE_LIMIT": 2.0,  # 全局请求速率上限（次/秒），0 表示不限速
+    "REQUEST_BURST": 4,  # 速率限制允许的突发请求数
     "LOG_DIR": "logs",
+    "LIKE_VELOCITY_WINDOW_HOURS": 6,  # 估算点赞增速使用最近 N 小时的点赞快照
+    "LIKE_HISTORY_DAYS": 14,  # 点赞快照保留天数，超过 1 天的快照按小时降采样
+    "KEYWORD_NORMALIZE": True,  # 关键词匹配前统一全角/半角与大小写
+    "KEYWORD_T2S": False,  # 繁体转简体后再匹配，需要 pip install opencc-python-reimplemented
+    "TARGETS_FILE": "",  # 监控对象 JSON 文件，设置后优先于 MONITOR_TARGETS，修改文件无需重启
+    "TARGETS_RELOAD_INTERVAL": 10,  # 检查监控对象文件变化的间隔（秒）
+    "SLOW_CYCLE_SECONDS": 0,  # 单轮轮询超过该秒数时在 LOG_DIR 保存线程调用栈并剖析下一轮，0 表示关闭
+    "METRICS_PORT": 0,  # Prometheus 指标端口（/metrics），0 表示关闭
+    "METRICS_HOST": "127.0.0.1",  # 指标服务监听地址，默认只允许本机访问
     "LOG_LEVEL": "INFO",
 }
 
@@ -56,4 +90,16 @@ BARK_CONFIG = {
     "GROUP": "xhs-monitor",
     "SOUND": "glass",
     "ICON": "",
+    "TIMEOUT": 10,  # 单台设备推送超时（秒），多台设备并发推送
+}
+
+# 企业微信应用消息，启用后与 Bark 并发推送；某个渠道失败时发件箱只重试该渠道
+WECOM_CONFIG = {
+    "ENABLED": False,
+    "CORP_ID": "你的企业ID",
+    "AGENT_ID": 1000002,
+    "SECRET": "你的应用Secret",
+    "TO_USER": "@all",  # 接收人，多个用 | 分隔
+    "TIMEOUT": 10,  # 请求超时（秒）
+    "TOKEN_CACHE_FILE": ".wecom_token.json",  # access_token 缓存文件，重启后在有效期内直接复用
 }
@@ -1,212 +1,726 @@
+import logging
 import sqlite3
-from datetime import datetime
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from note_view import NoteView, to_epoch
+
+
+class NoteState(NamedTuple):
+    published_time: Optional[int]
+    last_like_count: Optional[int]
+    hot_gate_notified: bool
+
+
+class OutboxMessage(NamedTuple):
+    dedupe_key: str
+    kind: str
+    title: str
+    body: str
+    url: str = ""
+    push_group: str = ""
+    user_id: Optional[str] = None
+    note_id: Optional[str] = None
+    like_count: Optional[int] = None
+    id: Optional[int] = None
+    attempts: int = 0
+    # 已送达的推送渠道，逗号分隔；部分渠道失败重试时跳过这些渠道
+    delivered_channels: str = ""
+
 
 class Database:
+    # 单条 SQL 中 IN (...) 参数的数量上限，低于 SQLite 默认的 999
+    IN_CHUNK_SIZE = 500
+    # 当前表结构版本，记录在 PRAGMA user_version 中
+    SCHEMA_VERSION = 6
+
     def __init__(self, db_path: str = "notes.db"):
         """
         初始化数据库连接
+        整个进程共用一个长连接（WAL + synchronous=NORMAL），由锁保证多线程串行访问；
+        SQL 文本固定，sqlite3 会复用已编译的语句。
         :param db_path: 数据库文件路径
         """
         self.db_path = db_path
+        self._lock = threading.RLock()
+        self._tx_depth = 0
+        self.statement_count = 0
+        self.commit_count = 0
+        self.statement_time = 0.0
+        self.conn = sqlite3.connect(
+            db_path,
+            check_same_thread=False,
+            isolation_level=None,
+            cached_statements=256,
+        )
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
         self.init_db()
+
+    @contextmanager
+    def transaction(self, immediate: bool = False):
+        """
+        开启事务，可嵌套，最外层退出时统一提交
+        :param immediate: 是否立即获取写锁（BEGIN IMMEDIATE）
+        """
+        with self._lock:
+            if self._tx_depth == 0:
+                self.conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+            self._tx_depth += 1
+            try:
+                yield self.conn.cursor()
+            except Exception:
+                self._tx_depth -= 1
+                if self._tx_depth == 0:
+                    self.conn.execute("ROLLBACK")
+                raise
+            self._tx_depth -= 1
+            if self._tx_depth == 0:
+                self.conn.execute("COMMIT")
+                self.commit_count += 1
+
+    def _execute(self, cursor, sql: str, params=()):
+        started = time.perf_counter()
+        cursor.execute(sql, params)
+        self.statement_time += time.perf_counter() - started
+        self.statement_count += 1
+        return cursor
+
+    def _executemany(self, cursor, sql: str, rows):
+        started = time.perf_counter()
+        cursor.executemany(sql, rows)
+        self.statement_time += time.perf_counter() - started
+        self.statement_count += 1
+        return cursor
+
+    def _query_one(self, sql: str, params=()):
+        with self._lock:
+            return self._execute(self.conn.cursor(), sql, params).fetchone()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "statements": self.statement_count,
+                "commits": self.commit_count,
+                "statement_time_ms": round(self.statement_time * 1000, 2),
+            }
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
     
     def init_db(self):
         """
-        初始化数据库表
+        初始化数据库表，并按 user_version 依次执行尚未应用的迁移。
+        全部迁移在同一个写事务中完成，失败时整体回滚，旧库保持原样。
         """
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                '''
-                CREATE TABLE IF NOT EXISTS notes (
-                    note_id TEXT PRIMARY KEY,
-                    user_id TEXT NOT NULL,
-                    title TEXT,
-                    published_time TEXT,
-                    discovered_time TEXT NOT NULL,
-                    type TEXT,
-                    last_like_count INTEGER
-                )
-                '''
+        migrations = (
+            (1, self._migrate_v1_base_tables),
+            (2, self._migrate_v2_epoch_timestamps),
+            (3, self._migrate_v3_user_published_index),
+            (4, self._migrate_v4_notification_outbox),
+            (5, self._migrate_v5_like_snapshots),
+            (6, self._migrate_v6_outbox_delivered_channels),
+        )
+        with self.transaction(immediate=True) as cursor:
+            version = cursor.execute("PRAGMA user_version").fetchone()[0]
+            for target_version, migrate in migrations:
+                if version >= target_version:
+                    continue
+                logging.info("数据库迁移：v%d -> v%d", version, target_version)
+                migrate(cursor)
+                version = target_version
+                cursor.execute(f"PRAGMA user_version = {version}")
+
+    def _migrate_v1_base_tables(self, cursor):
+        """最初的表结构；早期版本的库可能缺少后来补充的列。"""
+        cursor.execute(
+            '''
+            CREATE TABLE IF NOT EXISTS notes (
+                note_id TEXT PRIMARY KEY,
+                user_id TEXT NOT NULL,
+                title TEXT,
+                published_time TEXT,
+                discovered_time TEXT NOT NULL,
+                type TEXT,
+                last_like_count INTEGER
             )
-            cursor.execute(
-                '''
-                CREATE TABLE IF NOT EXISTS hot_gate_notifications (
-                    note_id TEXT PRIMARY KEY,
-                    user_id TEXT NOT NULL,
-                    like_count INTEGER NOT NULL,
-                    notified_time TEXT NOT NULL
-                )
-                '''
+            '''
+        )
+        cursor.execute(
+            '''
+            CREATE TABLE IF NOT EXISTS hot_gate_notifications (
+                note_id TEXT PRIMARY KEY,
+                user_id TEXT NOT NULL,
+                like_count INTEGER NOT NULL,
+                notified_time TEXT NOT NULL
             )
-            self._ensure_column(cursor, 'notes', 'published_time', 'TEXT')
-            self._ensure_column(cursor, 'notes', 'last_like_count', 'INTEGER')
-            conn.commit()
-    
+            '''
+        )
+        self._ensure_column(cursor, 'notes', 'published_time', 'TEXT')
+        self._ensure_column(cursor, 'notes', 'last_like_count', 'INTEGER')
+
+    def _migrate_v2_epoch_timestamps(self, cursor):
+        """
+        时间列改为 INTEGER 秒级时间戳。TEXT 亲和性的列会把整数转成字符串，
+        因此需要重建表。published_time 原先按 UTC 写入，discovered_time 与
+        notified_time 原先按本地时间写入。
+        """
+        cursor.execute(
+            '''
+            CREATE TABLE notes_v2 (
+                note_id TEXT PRIMARY KEY,
+                user_id TEXT NOT NULL,
+                title TEXT,
+                published_time INTEGER,
+                discovered_time INTEGER NOT NULL,
+                type TEXT,
+                last_like_count INTEGER
+            )
+            '''
+        )
+        cursor.execute(
+            "SELECT note_id, user_id, title, published_time, discovered_time, type, last_like_count FROM notes"
+        )
+        now = int(time.time())
+        rows = [
+            (
+                note_id,
+                user_id,
+                title,
+                to_epoch(published_time),
+                to_epoch(discovered_time, assume_local=True) or now,
+                note_type,
+                last_like_count,
+            )
+            for note_id, user_id, title, published_time, discovered_time, note_type, last_like_count
+            in cursor.fetchall()
+        ]
+        cursor.executemany("INSERT INTO notes_v2 VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+        cursor.execute("DROP TABLE notes")
+        cursor.execute("ALTER TABLE notes_v2 RENAME TO notes")
+
+        cursor.execute(
+            '''
+            CREATE TABLE hot_gate_notifications_v2 (
+                note_id TEXT PRIMARY KEY,
+                user_id TEXT NOT NULL,
+                like_count INTEGER NOT NULL,
+                notified_time INTEGER NOT NULL
+            )
+            '''
+        )
+        cursor.execute("SELECT note_id, user_id, like_count, notified_time FROM hot_gate_notifications")
+        rows = [
+            (note_id, user_id, like_count, to_epoch(notified_time, assume_local=True) or now)
+            for note_id, user_id, like_count, notified_time in cursor.fetchall()
+        ]
+        cursor.executemany("INSERT INTO hot_gate_notifications_v2 VALUES (?, ?, ?, ?)", rows)
+        cursor.execute("DROP TABLE hot_gate_notifications")
+        cursor.execute("ALTER TABLE hot_gate_notifications_v2 RENAME TO hot_gate_notifications")
+
+    def _migrate_v3_user_published_index(self, cursor):
+        """覆盖 get_latest_note_time / get_user_notes_count 的按用户查询。"""
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_notes_user_published ON notes (user_id, published_time)"
+        )
+
+    def _migrate_v4_notification_outbox(self, cursor):
+        """待推送消息落库，推送失败或进程重启后由后台线程继续投递。"""
+        cursor.execute(
+            '''
+            CREATE TABLE IF NOT EXISTS notification_outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                dedupe_key TEXT NOT NULL UNIQUE,
+                kind TEXT NOT NULL,
+                user_id TEXT,
+                note_id TEXT,
+                like_count INTEGER,
+                title TEXT NOT NULL,
+                body TEXT NOT NULL,
+                url TEXT,
+                push_group TEXT,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_time INTEGER NOT NULL,
+                created_time INTEGER NOT NULL,
+                sent_time INTEGER,
+                last_error TEXT
+            )
+            '''
+        )
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_outbox_status_next ON notification_outbox (status, next_attempt_time)"
+        )
+
+    def _migrate_v5_like_snapshots(self, cursor):
+        """点赞数时间序列，只在点赞数变化时追加，旧数据定期降采样。"""
+        cursor.execute(
+            '''
+            CREATE TABLE IF NOT EXISTS like_snapshots (
+                note_id TEXT NOT NULL,
+                ts INTEGER NOT NULL,
+                likes INTEGER NOT NULL,
+                PRIMARY KEY (note_id, ts)
+            ) WITHOUT ROWID
+            '''
+        )
+
+    def _migrate_v6_outbox_delivered_channels(self, cursor):
+        """多渠道推送时逐渠道记录送达情况，只重试失败的渠道。"""
+        cursor.execute(
+            "ALTER TABLE notification_outbox ADD COLUMN delivered_channels TEXT NOT NULL DEFAULT ''"
+        )
+
     def add_note_if_not_exists(self, note_data: dict) -> bool:
         """
         添加笔记记录
         :param note_data: 笔记数据
         :return: 是否为新笔记
         """
+        view = NoteView.from_raw(note_data)
+        return bool(self.upsert_notes(view.user_id, [view]))
+
+    def upsert_notes(self, user_id: str, notes: Iterable[NoteView]) -> Set[str]:
+        """
+        在一个事务内批量写入某用户的笔记，已存在的笔记更新标题、发布时间等字段，
+        点赞数仅在解析成功时覆盖
+        :param user_id: 用户ID，笔记未携带 user_id 时使用
+        :param notes: 笔记视图列表
+        :return: 本次新插入的 note_id 集合
+        """
+        discovered_time = int(time.time())
+        rows = [
+            (
+                view.note_id,
+                view.user_id or user_id,
+                view.title or '无标题',
+                view.published_ts,
+                discovered_time,
+                view.note_type,
+                view.like_count,
+            )
+            for view in notes
+            if view.note_id
+        ]
+        if not rows:
+            return set()
+        note_ids = [row[0] for row in rows]
 
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-
-            cursor.execute(
-                'SELECT note_id, last_like_count FROM notes WHERE note_id = ?',
-                (note_data.get('note_id'),),
-            )
-            exists = cursor.fetchone()
-
-            published_time = note_data.get('published_time', note_data.get('time', ''))
-            title = note_data.get('display_title', note_data.get('title', '无标题'))
-            note_type = note_data.get('type', 'normal')
-            user_id = note_data.get('user', {}).get('user_id')
-
-            like_count = note_data.get('liked_count')
-            if like_count is None:
-                raw_card = note_data.get('note_card') or {}
-                like_count = raw_card.get('liked_count')
-            if like_count is None:
-                raw_interact = note_data.get('interact_info') or {}
-                like_count = raw_interact.get('liked_count')
-            if isinstance(like_count, str):
-                stripped = like_count.strip()
-                if stripped.isdigit():
-                    like_count = int(stripped)
-                else:
-                    try:
-                        like_count = int(float(stripped))
-                    except Exception:
-                        like_count = None
-
-            if exists:
-                stored_like = exists[1] if isinstance(exists, tuple) and len(exists) > 1 else None
-                cursor.execute(
-                    '''
-                    UPDATE notes
-                    SET user_id = ?, title = ?, published_time = ?, type = ?
-                    WHERE note_id = ?
-                    ''',
-                    (user_id, title, published_time, note_type, note_data.get('note_id')),
+        with self.transaction() as cursor:
+            existing: Set[str] = set()
+            for start in range(0, len(note_ids), self.IN_CHUNK_SIZE):
+                chunk = note_ids[start:start + self.IN_CHUNK_SIZE]
+                placeholders = ','.join('?' * len(chunk))
+                self._execute(
+                    cursor,
+                    f"SELECT note_id FROM notes WHERE note_id IN ({placeholders})",
+                    chunk,
                 )
-                if like_count is not None and like_count != stored_like:
-                    cursor.execute(
-                        "UPDATE notes SET last_like_count = ? WHERE note_id = ?",
-                        (like_count, note_data.get('note_id')),
-                    )
-                conn.commit()
-                return False
-
-            cursor.execute(
+                existing.update(row[0] for row in cursor.fetchall())
+            self._executemany(
+                cursor,
                 '''
                 INSERT INTO notes (
                     note_id, user_id, title, published_time, discovered_time, type, last_like_count
                 ) VALUES (?, ?, ?, ?, ?, ?, ?)
-                '''
-            , (
-                note_data.get('note_id'),
-                user_id,
-                title,
-                published_time,
-                datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                note_type,
-                like_count
-            ))
-            conn.commit()
-            return True
-    
+                ON CONFLICT(note_id) DO UPDATE SET
+                    user_id = excluded.user_id,
+                    title = excluded.title,
+                    published_time = excluded.published_time,
+                    type = excluded.type,
+                    last_like_count = COALESCE(excluded.last_like_count, notes.last_like_count)
+                ''',
+                rows,
+            )
+        return {note_id for note_id in note_ids if note_id not in existing}
+
     def get_user_notes_count(self, user_id: str) -> int:
         """
         获取数据库中某用户的笔记数量
         :param user_id: 用户ID
         :return: 笔记数量
         """
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT COUNT(*) FROM notes WHERE user_id = ?", (user_id,))
-            count = cursor.fetchone()[0]
-            return count or 0
-
-    def get_latest_note_time(self, user_id: str) -> str:
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                "SELECT MAX(published_time) FROM notes WHERE user_id = ?",
-                (user_id,),
-            )
-            result = cursor.fetchone()[0]
-            return result or ""
-
-    def get_note_published_time(self, note_id: str) -> str:
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                "SELECT published_time FROM notes WHERE note_id = ?",
-                (note_id,),
-            )
-            result = cursor.fetchone()
-            if result:
-                return result[0] or ""
-            return ""
-
-    def update_published_time(self, note_id: str, published_time: str):
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute(
+        count = self._query_one("SELECT COUNT(*) FROM notes WHERE user_id = ?", (user_id,))[0]
+        return count or 0
+
+    def get_latest_note_time(self, user_id: str) -> Optional[int]:
+        """
+        :return: 某用户最新笔记的发布时间（秒级时间戳），没有记录时为 None
+        """
+        return self._query_one(
+            "SELECT MAX(published_time) FROM notes WHERE user_id = ?",
+            (user_id,),
+        )[0]
+
+    def get_latest_note_times(self) -> Dict[str, int]:
+        """
+        :return: user_id -> 最新笔记发布时间（秒级时间戳），一次 GROUP BY 查询得到全部用户
+        """
+        with self._lock:
+            cursor = self._execute(
+                self.conn.cursor(),
+                "SELECT user_id, MAX(published_time) FROM notes GROUP BY user_id",
+            )
+            return {user_id: latest for user_id, latest in cursor.fetchall() if latest is not None}
+
+    def get_publish_history(self, since_ts: int, user_id: Optional[str] = None) -> Dict[str, List[int]]:
+        """
+        读取发布时间序列，用于学习账号的发帖频率
+        :param since_ts: 起始时间（秒级时间戳）
+        :param user_id: 指定用户，为空时返回全部用户
+        :return: user_id -> 发布时间列表（升序）
+        """
+        if user_id is None:
+            sql = "SELECT user_id, published_time FROM notes WHERE published_time >= ? ORDER BY published_time"
+            params = (since_ts,)
+        else:
+            sql = (
+                "SELECT user_id, published_time FROM notes "
+                "WHERE user_id = ? AND published_time >= ? ORDER BY published_time"
+            )
+            params = (user_id, since_ts)
+        history: Dict[str, List[int]] = {}
+        with self._lock:
+            cursor = self._execute(self.conn.cursor(), sql, params)
+            for owner_id, published_time in cursor.fetchall():
+                history.setdefault(owner_id, []).append(published_time)
+        return history
+
+    def get_note_published_time(self, note_id: str) -> Optional[int]:
+        result = self._query_one(
+            "SELECT published_time FROM notes WHERE note_id = ?",
+            (note_id,),
+        )
+        if result:
+            return result[0]
+        return None
+
+    def update_published_time(self, note_id: str, published_time: int):
+        with self.transaction() as cursor:
+            self._execute(
+                cursor,
                 "UPDATE notes SET published_time = ? WHERE note_id = ?",
                 (published_time, note_id),
             )
-            conn.commit()
 
     def update_last_like_count(self, note_id: str, like_count: int):
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute(
+        with self.transaction() as cursor:
+            self._execute(
+                cursor,
                 "UPDATE notes SET last_like_count = ? WHERE note_id = ?",
                 (like_count, note_id),
             )
-            conn.commit()
 
     def get_last_like_count(self, note_id: str):
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                "SELECT last_like_count FROM notes WHERE note_id = ?",
-                (note_id,),
-            )
-            result = cursor.fetchone()
-            if result:
-                return result[0]
-            return None
+        result = self._query_one(
+            "SELECT last_like_count FROM notes WHERE note_id = ?",
+            (note_id,),
+        )
+        if result:
+            return result[0]
+        return None
 
     def mark_hot_gate_notified(self, note_id: str, user_id: str, like_count: int):
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute(
+        self.mark_hot_gate_notified_many([(note_id, user_id, like_count)])
+
+    def mark_hot_gate_notified_many(self, rows: Iterable[Tuple[str, str, int]]):
+        """
+        批量记录点赞达标推送
+        :param rows: (note_id, user_id, like_count) 列表
+        """
+        notified_time = int(time.time())
+        params = [(note_id, user_id, like_count, notified_time) for note_id, user_id, like_count in rows]
+        if not params:
+            return
+        with self.transaction() as cursor:
+            self._executemany(
+                cursor,
                 """
                 INSERT OR REPLACE INTO hot_gate_notifications (
                     note_id, user_id, like_count, notified_time
                 ) VALUES (?, ?, ?, ?)
                 """,
-                (
-                    note_id,
-                    user_id,
-                    like_count,
-                    datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                ),
+                params,
+            )
+
+    def get_note_states(self, note_ids: Iterable[str]) -> Dict[str, NoteState]:
+        """
+        一次性读取多条笔记的发布时间、最近点赞数与点赞提醒状态
+        :param note_ids: 笔记ID列表
+        :return: note_id -> NoteState，数据库中不存在的笔记不会出现在结果中
+        """
+        ids = [note_id for note_id in dict.fromkeys(note_ids) if note_id]
+        states: Dict[str, NoteState] = {}
+        with self._lock:
+            cursor = self.conn.cursor()
+            for start in range(0, len(ids), self.IN_CHUNK_SIZE):
+                chunk = ids[start:start + self.IN_CHUNK_SIZE]
+                placeholders = ','.join('?' * len(chunk))
+                self._execute(
+                    cursor,
+                    f"""
+                    SELECT n.note_id, n.published_time, n.last_like_count, h.note_id IS NOT NULL
+                    FROM notes n
+                    LEFT JOIN hot_gate_notifications h ON h.note_id = n.note_id
+                    WHERE n.note_id IN ({placeholders})
+                    """,
+                    chunk,
+                )
+                for note_id, published_time, last_like_count, notified in cursor.fetchall():
+                    states[note_id] = NoteState(published_time, last_like_count, bool(notified))
+        return states
+
+    def get_users_with_open_hot_gate_notes(self, since_ts: int) -> Set[str]:
+        """
+        :param since_ts: 点赞检查窗口起点（秒级时间戳）
+        :return: 窗口期内仍有笔记未推送点赞达标提醒的用户ID集合
+        """
+        with self._lock:
+            cursor = self._execute(
+                self.conn.cursor(),
+                """
+                SELECT DISTINCT n.user_id
+                FROM notes n
+                LEFT JOIN hot_gate_notifications h ON h.note_id = n.note_id
+                WHERE n.published_time >= ? AND h.note_id IS NULL
+                """,
+                (since_ts,),
             )
-            conn.commit()
+            return {row[0] for row in cursor.fetchall()}
 
     def is_hot_gate_notified(self, note_id: str) -> bool:
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                "SELECT 1 FROM hot_gate_notifications WHERE note_id = ?",
-                (note_id,),
+        return self._query_one(
+            "SELECT 1 FROM hot_gate_notifications WHERE note_id = ?",
+            (note_id,),
+        ) is not None
+
+    def add_like_snapshots(self, rows: Iterable[Tuple[str, int, int]]):
+        """
+        追加点赞快照
+        :param rows: (note_id, ts, likes) 列表，调用方只传入点赞数有变化的笔记
+        """
+        rows = list(rows)
+        if not rows:
+            return
+        with self.transaction() as cursor:
+            self._executemany(
+                cursor,
+                "INSERT OR REPLACE INTO like_snapshots (note_id, ts, likes) VALUES (?, ?, ?)",
+                rows,
+            )
+
+    def get_like_snapshots(self, note_ids: Iterable[str], since_ts: int) -> Dict[str, List[Tuple[int, int]]]:
+        """
+        :param since_ts: 只读取该时间之后的快照
+        :return: note_id -> 按时间升序的 (ts, likes) 列表
+        """
+        ids = [note_id for note_id in dict.fromkeys(note_ids) if note_id]
+        history: Dict[str, List[Tuple[int, int]]] = {}
+        with self._lock:
+            cursor = self.conn.cursor()
+            for start in range(0, len(ids), self.IN_CHUNK_SIZE):
+                chunk = ids[start:start + self.IN_CHUNK_SIZE]
+                placeholders = ','.join('?' * len(chunk))
+                self._execute(
+                    cursor,
+                    f"""
+                    SELECT note_id, ts, likes FROM like_snapshots
+                    WHERE note_id IN ({placeholders}) AND ts >= ?
+                    ORDER BY note_id, ts
+                    """,
+                    [*chunk, since_ts],
+                )
+                for note_id, ts, likes in cursor.fetchall():
+                    history.setdefault(note_id, []).append((ts, likes))
+        return history
+
+    def compact_like_snapshots(self, raw_before_ts: int, bucket_seconds: int, expire_before_ts: int) -> int:
+        """
+        降采样点赞快照：expire_before_ts 之前的全部删除；raw_before_ts 之前的
+        每个时间桶只保留最后一个点
+        :return: 删除的行数
+        """
+        bucket_seconds = max(1, int(bucket_seconds))
+        with self.transaction() as cursor:
+            self._execute(cursor, "DELETE FROM like_snapshots WHERE ts < ?", (expire_before_ts,))
+            removed = cursor.rowcount
+            self._execute(
+                cursor,
+                """
+                DELETE FROM like_snapshots
+                WHERE ts < ? AND (note_id, ts) NOT IN (
+                    SELECT note_id, MAX(ts) FROM like_snapshots
+                    WHERE ts < ?
+                    GROUP BY note_id, ts / ?
+                )
+                """,
+                (raw_before_ts, raw_before_ts, bucket_seconds),
+            )
+            return removed + cursor.rowcount
+
+    def enqueue_notifications(self, messages: Iterable[OutboxMessage]) -> int:
+        """
+        写入待推送消息，dedupe_key 已存在的消息直接忽略
+        :return: 实际新增的消息数量
+        """
+        now = int(time.time())
+        params = [
+            (
+                message.dedupe_key,
+                message.kind,
+                message.user_id,
+                message.note_id,
+                message.like_count,
+                message.title,
+                message.body,
+                message.url,
+                message.push_group,
+                now,
+                now,
+            )
+            for message in messages
+        ]
+        if not params:
+            return 0
+        with self.transaction() as cursor:
+            self._executemany(
+                cursor,
+                """
+                INSERT OR IGNORE INTO notification_outbox (
+                    dedupe_key, kind, user_id, note_id, like_count, title, body, url, push_group,
+                    next_attempt_time, created_time
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                params,
+            )
+            return cursor.rowcount
+
+    def get_due_notifications(self, now: int, limit: int = 50) -> List[OutboxMessage]:
+        """
+        :param now: 当前秒级时间戳，只返回已到重试时间的消息
+        :return: 按入队顺序排列的待推送消息
+        """
+        with self._lock:
+            cursor = self._execute(
+                self.conn.cursor(),
+                """
+                SELECT dedupe_key, kind, title, body, url, push_group, user_id, note_id, like_count, id, attempts,
+                       delivered_channels
+                FROM notification_outbox
+                WHERE status = 'pending' AND next_attempt_time <= ?
+                ORDER BY id
+                LIMIT ?
+                """,
+                (now, limit),
+            )
+            return [OutboxMessage(*row) for row in cursor.fetchall()]
+
+    def get_next_notification_time(self) -> Optional[int]:
+        row = self._query_one(
+            "SELECT MIN(next_attempt_time) FROM notification_outbox WHERE status = 'pending'"
+        )
+        return row[0] if row else None
+
+    def mark_notifications_sent(self, messages: Iterable[OutboxMessage]):
+        """
+        标记消息已送达；点赞达标消息同时写入 hot_gate_notifications
+        """
+        messages = list(messages)
+        if not messages:
+            return
+        now = int(time.time())
+        hot_gate_rows = [
+            (message.note_id, message.user_id or "", message.like_count or 0, now)
+            for message in messages
+            if message.kind == "hot_gate" and message.note_id
+        ]
+        with self.transaction() as cursor:
+            self._executemany(
+                cursor,
+                """
+                UPDATE notification_outbox
+                SET status = 'sent', attempts = attempts + 1, sent_time = ?, last_error = NULL
+                WHERE id = ?
+                """,
+                [(now, message.id) for message in messages],
+            )
+            if hot_gate_rows:
+                self._executemany(
+                    cursor,
+                    """
+                    INSERT OR REPLACE INTO hot_gate_notifications (
+                        note_id, user_id, like_count, notified_time
+                    ) VALUES (?, ?, ?, ?)
+                    """,
+                    hot_gate_rows,
+                )
+
+    def mark_notifications_failed(
+        self,
+        messages: Iterable[OutboxMessage],
+        error: str,
+        next_attempt_time: Optional[int],
+        delivered_channels: Optional[str] = None,
+    ):
+        """
+        记录一次投递失败
+        :param next_attempt_time: 下次重试时间，None 表示不再重试
+        :param delivered_channels: 已送达的渠道（逗号分隔），None 表示保持不变
+        """
+        status = "pending" if next_attempt_time is not None else "failed"
+        params = [(status, next_attempt_time, error, delivered_channels, message.id) for message in messages]
+        if not params:
+            return
+        with self.transaction() as cursor:
+            self._executemany(
+                cursor,
+                """
+                UPDATE notification_outbox
+                SET status = ?, attempts = attempts + 1, next_attempt_time = COALESCE(?, next_attempt_time),
+                    last_error = ?, delivered_channels = COALESCE(?, delivered_channels)
+                WHERE id = ?
+                """,
+                params,
+            )
+
+    def defer_notifications(self, message_ids: Iterable[int], next_attempt_time: int):
+        """推迟消息的投递时间，不计入尝试次数。"""
+        params = [(next_attempt_time, message_id) for message_id in message_ids]
+        if not params:
+            return
+        with self.transaction() as cursor:
+            self._executemany(
+                cursor,
+                "UPDATE notification_outbox SET next_attempt_time = ? WHERE id = ?",
+                params,
+            )
+
+    def purge_sent_notifications(self, before_ts: int) -> int:
+        """
+        删除 before_ts 之前已送达的消息
+        :return: 删除的行数
+        """
+        with self.transaction() as cursor:
+            self._execute(
+                cursor,
+                "DELETE FROM notification_outbox WHERE status = 'sent' AND sent_time < ?",
+                (before_ts,),
+            )
+            return cursor.rowcount
+
+    def get_outbox_counts(self) -> Dict[str, int]:
+        """
+        :return: status -> 消息数量
+        """
+        with self._lock:
+            cursor = self._execute(
+                self.conn.cursor(),
+                "SELECT status, COUNT(*) FROM notification_outbox GROUP BY status",
             )
-            return cursor.fetchone() is not None
+            return dict(cursor.fetchall())
 
     def _ensure_column(self, cursor, table: str, column: str, column_type: str):
         cursor.execute(f"PRAGMA table_info({table})")
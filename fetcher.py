@@ -0,0 +1,180 @@
+import asyncio
+import concurrent.futures
+import json
+import logging
+import threading
+import time
+from typing import Dict, Optional
+
+import aiohttp
+from xhs.exception import DataFetchError, IPBlockError, NeedVerifyError, SignError
+
+from metrics import FETCH_DURATION
+from throttle import RateLimiter
+from tracing import TRACER
+from utils import parse_cookie
+
+XHS_API_BASE = "https://edith.xiaohongshu.com"
+USER_POSTED_URI = "/api/sns/web/v1/user_posted"
+DEFAULT_USER_AGENT = (
+    "Mozilla/5.0 "
+    "(Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 "
+    "(KHTML, like Gecko) "
+    "Chrome/111.0.0.0 Safari/537.36"
+)
+# 与 xhs 库保持一致的错误码
+IP_BLOCK_CODE = 300012
+SIGN_FAULT_CODE = 300015
+
+
+class AsyncNoteFetcher:
+    """
+    基于 aiohttp 的用户笔记拉取器：在独立的事件循环线程中复用一个 ClientSession，
+    所有请求共享连接池与 keep-alive，大量监控对象只占用一个线程。
+    返回值与 xhs.XhsClient.get_user_notes 相同，出错时抛出相同的 xhs 异常。
+    """
+
+    def __init__(
+        self,
+        cookie: str,
+        signer,
+        host_limit: int = 4,
+        rate_limiter: Optional[RateLimiter] = None,
+        timeout: float = 10,
+        user_agent: Optional[str] = None,
+    ):
+        self.cookie = cookie
+        self.signer = signer
+        self.host_limit = int(host_limit or 0)
+        self.rate_limiter = rate_limiter
+        self.timeout = timeout
+        self.user_agent = user_agent or DEFAULT_USER_AGENT
+        cookies = parse_cookie(cookie)
+        self._a1 = cookies.get("a1", "")
+        self._web_session = cookies.get("web_session", "")
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._host_semaphore: Optional[asyncio.Semaphore] = None
+
+    def submit(self, user_id: str, cursor: str = "") -> concurrent.futures.Future:
+        """在拉取线程中调度一次请求，可被任意线程调用。"""
+        loop = self._ensure_loop()
+        return asyncio.run_coroutine_threadsafe(self.get_user_notes(user_id, cursor), loop)
+
+    async def get_user_notes(self, user_id: str, cursor: str = "") -> Dict:
+        params = {"num": 30, "cursor": cursor, "user_id": user_id, "image_scenes": "FD_WM_WEBP"}
+        # 签名基于未编码的 uri，拼接方式与 xhs 库相同
+        uri = f"{USER_POSTED_URI}?{'&'.join(f'{k}={v}' for k, v in params.items())}"
+        started = time.perf_counter()
+        try:
+            return await self._get(uri)
+        finally:
+            elapsed = time.perf_counter() - started
+            FETCH_DURATION.observe(elapsed, target=user_id)
+            TRACER.record("fetch", elapsed)
+
+    def close(self):
+        loop = self._loop
+        if not loop or not loop.is_running():
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._close_session(), loop).result(timeout=10)
+        except Exception:
+            logging.exception("关闭 aiohttp 会话失败")
+        loop.call_soon_threadsafe(loop.stop)
+        if self._thread:
+            self._thread.join(timeout=10)
+        self._loop = None
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        if self._loop and self._loop.is_running():
+            return self._loop
+        with self._start_lock:
+            if self._loop and self._loop.is_running():
+                return self._loop
+            loop = asyncio.new_event_loop()
+            started = threading.Event()
+
+            def _run():
+                asyncio.set_event_loop(loop)
+                loop.call_soon(started.set)
+                loop.run_forever()
+                loop.close()
+
+            thread = threading.Thread(target=_run, name="xhs-fetch-loop", daemon=True)
+            thread.start()
+            started.wait()
+            self._thread = thread
+            self._loop = loop
+            return loop
+
+    async def _ensure_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit_per_host=max(0, self.host_limit),
+                keepalive_timeout=60,
+                ttl_dns_cache=300,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                # Cookie 由配置决定，不接收响应里的 Set-Cookie，与 xhs 库发送的内容保持一致
+                cookie_jar=aiohttp.DummyCookieJar(),
+                headers={
+                    "user-agent": self.user_agent,
+                    "Content-Type": "application/json",
+                    "cookie": self.cookie,
+                },
+            )
+            if self.host_limit > 0:
+                self._host_semaphore = asyncio.Semaphore(self.host_limit)
+        return self._session
+
+    async def _get(self, uri: str) -> Dict:
+        session = await self._ensure_session()
+        if self.rate_limiter is not None:
+            delay = self.rate_limiter.reserve()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        headers = await self.signer.sign_async(uri, a1=self._a1, web_session=self._web_session)
+        if self._host_semaphore is None:
+            return await self._request(session, uri, headers)
+        async with self._host_semaphore:
+            return await self._request(session, uri, headers)
+
+    async def _request(self, session: aiohttp.ClientSession, uri: str, headers: Dict[str, str]) -> Dict:
+        async with session.get(f"{XHS_API_BASE}{uri}", headers=headers) as response:
+            status = response.status
+            text = await response.text()
+            response_headers = response.headers
+        if status in (461, 471):
+            verify_type = response_headers.get("Verifytype")
+            verify_uuid = response_headers.get("Verifyuuid")
+            raise NeedVerifyError(
+                f"出现验证码，请求失败，Verifytype: {verify_type}，Verifyuuid: {verify_uuid}",
+                verify_type=verify_type,
+                verify_uuid=verify_uuid,
+            )
+        try:
+            data = json.loads(text) if text else None
+        except json.JSONDecodeError:
+            data = None
+        if not isinstance(data, dict):
+            raise DataFetchError(f"接口返回无法解析：status={status} | body={text[:200]}")
+        if data.get("success"):
+            return data.get("data") or {}
+        code = data.get("code")
+        if code == IP_BLOCK_CODE:
+            raise IPBlockError("网络连接异常，请检查网络设置或重启试试")
+        if code == SIGN_FAULT_CODE:
+            raise SignError("浏览器异常，请尝试关闭/卸载风险插件或重启试试！")
+        raise DataFetchError(data)
+
+    async def _close_session(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
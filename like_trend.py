@@ -0,0 +1,69 @@
+import math
+from typing import List, Optional, Sequence, Tuple
+
+
+def like_velocity(points: Sequence[Tuple[int, int]], min_span: float = 600) -> Optional[float]:
+    """
+    用最小二乘拟合点赞数随时间的增长速度
+    :param points: 按时间升序的 (ts, likes)
+    :param min_span: 首尾时间跨度不足该秒数时样本太少，不做估计
+    :return: 每秒增长的点赞数，无法估计时为 None
+    """
+    if len(points) < 2 or points[-1][0] - points[0][0] < min_span:
+        return None
+    count = len(points)
+    # 以第一个点为原点，避免时间戳平方带来的精度损失
+    origin = points[0][0]
+    mean_t = sum(ts - origin for ts, _ in points) / count
+    mean_y = sum(likes for _, likes in points) / count
+    numerator = 0.0
+    denominator = 0.0
+    for ts, likes in points:
+        dt = ts - origin - mean_t
+        numerator += dt * (likes - mean_y)
+        denominator += dt * dt
+    if denominator <= 0:
+        return None
+    return numerator / denominator
+
+
+def predict_crossing(
+    points: Sequence[Tuple[int, int]],
+    threshold: int,
+    min_span: float = 600,
+) -> Optional[float]:
+    """
+    按当前增速预测点赞数达到 threshold 的时间
+    :param points: 按时间升序的 (ts, likes)，最后一个点视为当前值
+    :return: 预计达标的秒级时间戳；已达标时为最后一个点的时间；不再增长时为 math.inf；
+             样本不足无法估计时为 None
+    """
+    if not points:
+        return None
+    last_ts, last_likes = points[-1]
+    if last_likes >= threshold:
+        return float(last_ts)
+    velocity = like_velocity(points, min_span)
+    if velocity is None:
+        return None
+    if velocity <= 0:
+        return math.inf
+    return last_ts + (threshold - last_likes) / velocity
+
+
+def earliest_crossing(
+    histories: List[Sequence[Tuple[int, int]]],
+    threshold: int,
+    min_span: float = 600,
+) -> Optional[float]:
+    """
+    :return: 多条笔记中最早的预计达标时间；有笔记无法估计且其余都不再增长时为 None
+    """
+    predictions = [predict_crossing(points, threshold, min_span) for points in histories]
+    known = [eta for eta in predictions if eta is not None]
+    if not known:
+        return None
+    earliest = min(known)
+    if earliest == math.inf and len(known) < len(predictions):
+        return None
+    return earliest
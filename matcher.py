@@ -0,0 +1,159 @@
+import logging
+import unicodedata
+from collections import deque
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+
+def _load_t2s() -> Optional[Callable[[str], str]]:
+    try:
+        import opencc
+    except ImportError:
+        logging.warning("未安装 opencc，繁简转换已关闭（pip install opencc-python-reimplemented）")
+        return None
+    for config in ("t2s", "t2s.json"):
+        try:
+            return opencc.OpenCC(config).convert
+        except Exception:
+            continue
+    logging.warning("opencc 无法加载 t2s 配置，繁简转换已关闭")
+    return None
+
+
+class TextNormalizer:
+    """
+    匹配前的文本归一化：NFKC（全角转半角）、大小写折叠，可选繁体转简体。
+    关键词和笔记文本必须经过同一个归一化器，匹配结果才一致。
+    """
+
+    def __init__(self, enabled: bool = True, traditional_to_simplified: bool = False):
+        self.enabled = enabled
+        self._t2s = _load_t2s() if enabled and traditional_to_simplified else None
+
+    def __call__(self, text: str) -> str:
+        if not text or not self.enabled:
+            return text or ""
+        text = unicodedata.normalize("NFKC", text).casefold()
+        if self._t2s is not None:
+            text = self._t2s(text)
+        return text
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick 多关键词匹配：所有监控对象的关键词编译进同一个自动机，
+    每段文本只扫描一遍，耗时与文本长度和命中数有关，与关键词总数基本无关。
+    关键词可以随时增删，自动机在下一次匹配前重新构建。
+    """
+
+    def __init__(self, normalizer: Optional[TextNormalizer] = None):
+        self.normalizer = normalizer or TextNormalizer(enabled=False)
+        # owner -> {原始关键词: 配置中的顺序}
+        self._owner_keywords: Dict[str, Dict[str, int]] = {}
+        self._dirty = True
+        self._goto: List[Dict[str, int]] = []
+        self._outputs: List[List[int]] = []
+        # 模式编号 -> {owner: [原始关键词]}，不同写法归一化后可能是同一个模式
+        self._pattern_owners: List[Dict[str, List[str]]] = []
+
+    def __len__(self) -> int:
+        return sum(len(keywords) for keywords in self._owner_keywords.values())
+
+    def add(self, keyword: str, owner: str):
+        keyword = (keyword or "").strip()
+        if not keyword:
+            return
+        keywords = self._owner_keywords.setdefault(owner, {})
+        if keyword not in keywords:
+            keywords[keyword] = len(keywords)
+            self._dirty = True
+
+    def add_many(self, keywords: Iterable[str], owner: str):
+        for keyword in keywords:
+            self.add(keyword, owner)
+
+    def remove_owner(self, owner: str):
+        if self._owner_keywords.pop(owner, None) is not None:
+            self._dirty = True
+
+    def match(self, text: str, owner: str) -> List[str]:
+        """
+        :return: 该 owner 命中的原始关键词，按配置顺序排列
+        """
+        keywords = self._owner_keywords.get(owner)
+        if not keywords or not text:
+            return []
+        hits: Set[str] = set()
+        for pattern_id in self._scan(text):
+            hits.update(self._pattern_owners[pattern_id].get(owner, ()))
+        return sorted(hits, key=keywords.__getitem__)
+
+    def match_all(self, text: str) -> Dict[str, List[str]]:
+        """
+        :return: owner -> 命中的原始关键词
+        """
+        hits: Dict[str, Set[str]] = {}
+        for pattern_id in self._scan(text):
+            for owner, originals in self._pattern_owners[pattern_id].items():
+                hits.setdefault(owner, set()).update(originals)
+        return {
+            owner: sorted(matched, key=self._owner_keywords[owner].__getitem__)
+            for owner, matched in hits.items()
+        }
+
+    def _scan(self, text: str) -> Set[int]:
+        if self._dirty:
+            self._build()
+        goto, outputs = self._goto, self._outputs
+        found: Set[int] = set()
+        state = 0
+        for char in self.normalizer(text):
+            # 失败跳转已在构建时展开进 goto，每个字符只查一次表
+            state = goto[state].get(char, 0)
+            if outputs[state]:
+                found.update(outputs[state])
+        return found
+
+    def _build(self):
+        pattern_ids: Dict[str, int] = {}
+        pattern_owners: List[Dict[str, List[str]]] = []
+        goto: List[Dict[str, int]] = [{}]
+        outputs: List[List[int]] = [[]]
+        for owner, keywords in self._owner_keywords.items():
+            for keyword in keywords:
+                pattern = self.normalizer(keyword)
+                if not pattern:
+                    continue
+                pattern_id = pattern_ids.get(pattern)
+                if pattern_id is None:
+                    pattern_id = len(pattern_owners)
+                    pattern_ids[pattern] = pattern_id
+                    pattern_owners.append({})
+                    state = 0
+                    for char in pattern:
+                        next_state = goto[state].get(char)
+                        if next_state is None:
+                            next_state = len(goto)
+                            goto[state][char] = next_state
+                            goto.append({})
+                            outputs.append([])
+                        state = next_state
+                    outputs[state].append(pattern_id)
+                pattern_owners[pattern_id].setdefault(owner, []).append(keyword)
+
+        # 按层 BFS 计算失败指针，并把失败状态的转移和输出合并进当前状态（确定化）
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            outputs[state] = outputs[state] + outputs[fail[state]]
+            for char, next_state in list(goto[state].items()):
+                queue.append(next_state)
+                # 失败状态层数更浅，已经确定化，直接查表即可
+                fail[next_state] = goto[fail[state]].get(char, 0)
+            for char, target in goto[fail[state]].items():
+                goto[state].setdefault(char, target)
+
+        self._goto = goto
+        self._outputs = outputs
+        self._pattern_owners = pattern_owners
+        self._dirty = False
@@ -1,312 +1,821 @@
 import json
 import logging
+import math
 import os
+import random
+import threading
 import time
-from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
 from logging.handlers import TimedRotatingFileHandler
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, NamedTuple, Optional, Set, Tuple
 
 from xhs import XhsClient
+from xhs.exception import DataFetchError
 
 from bark import BarkClient
+from breaker import COOKIE_EXPIRED, RATE_LIMITED, CircuitBreaker, classify_error
 from config import BARK_CONFIG, MONITOR_CONFIG, MONITOR_TARGETS, XHS_CONFIG
-from db import Database
-from utils import xhs_sign
+from db import Database, NoteState, OutboxMessage
+from fetcher import AsyncNoteFetcher
+from like_trend import earliest_crossing
+from matcher import TextNormalizer
+from metrics import CYCLE_DURATION, CYCLE_TARGETS, FETCH_DURATION, FETCH_ERRORS, REGISTRY, start_metrics_server
+from note_view import NoteView, raw_like_count
+from notifier import MultiNotifier
+from outbox import OutboxDispatcher
+from rules import DEFAULT_GROUP, KeywordRuleEngine
+from scheduler import PollScheduler, PostingProfile
+from targets import TargetsFileWatcher, diff_targets
+from throttle import HostLimiter, RateLimiter
+from tracing import TRACER, SlowCycleWatchdog, format_breakdown, span
+from utils import get_signer, parse_cookie
+from wecom import WecomMessage
+
+try:
+    from config import WECOM_CONFIG
+except ImportError:
+    # 旧版 config.py 没有企业微信配置
+    WECOM_CONFIG = {}
 
 APP_VERSION = "2024.10.20.1"
+XHS_API_HOST = "edith.xiaohongshu.com"
 
-class XHSMonitor:
-    DAILY_SECONDS = 86400
 
+class FetchPermit(NamedTuple):
+    """一次拉取的放行凭证，结果按放行时的熔断器状态回报"""
+    breaker: CircuitBreaker
+    generation: int
+    global_generation: int
+
+
+class XHSMonitor:
     def __init__(self, cookie: str, monitor_targets: List[Dict]):
-        self.client = XhsClient(cookie=cookie, sign=xhs_sign)
-        self.notifier = BarkClient(
-            base_url=BARK_CONFIG.get("BASE_URL", "https://api.day.app"),
-            device_key=BARK_CONFIG.get("DEVICE_KEY", ""),
-            group=BARK_CONFIG.get("GROUP", ""),
-            sound=BARK_CONFIG.get("SOUND", ""),
-            icon=BARK_CONFIG.get("ICON", ""),
-        )
+        self.cookie = cookie
+        self.signer = get_signer(pool_size=MONITOR_CONFIG.get("SIGN_POOL_SIZE", 2))
+        # XhsClient 签名时会改写共享 session 的请求头，每个轮询线程各用一个实例
+        self._client_local = threading.local()
+        self.notifier = self._build_notifier()
         self.db = Database()
-        self.error_count = 0
+        # 推送只写入发件箱，由后台线程投递，推送接口变慢或故障不会阻塞轮询
+        self.outbox = OutboxDispatcher(
+            self.db,
+            self.notifier,
+            max_attempts=MONITOR_CONFIG.get("OUTBOX_MAX_ATTEMPTS", 10),
+            retry_wait=MONITOR_CONFIG.get("OUTBOX_RETRY_WAIT", 30),
+            retention_days=MONITOR_CONFIG.get("OUTBOX_RETENTION_DAYS", 7),
+            coalesce_window=MONITOR_CONFIG.get("NOTIFY_COALESCE_WINDOW", 60),
+            coalesce_threshold=MONITOR_CONFIG.get("NOTIFY_COALESCE_THRESHOLD", 3),
+        )
+        # 每个用户已入库笔记的最新发布时间；监控进程是唯一写入方，启动时加载一次即可
+        self.watermarks: Dict[str, datetime] = {
+            user_id: self._from_epoch(latest)
+            for user_id, latest in self.db.get_latest_note_times().items()
+        }
+        # 上一轮各用户笔记列表的指纹，列表未变化时直接跳过处理
+        self.page_fingerprints: Dict[str, int] = {}
+        # 配置了 TARGETS_FILE 时监控对象从该文件读取，运行中修改文件会增量生效
+        self.targets_watcher: Optional[TargetsFileWatcher] = None
+        targets_file = MONITOR_CONFIG.get("TARGETS_FILE")
+        if targets_file:
+            self.targets_watcher = TargetsFileWatcher(targets_file)
+            loaded = self.targets_watcher.load()
+            if loaded is not None:
+                monitor_targets = loaded
+            else:
+                logging.warning("监控对象文件不可用，暂时使用 config.py 中的 MONITOR_TARGETS：%s", targets_file)
+        self.targets_reload_interval = max(1.0, float(MONITOR_CONFIG.get("TARGETS_RELOAD_INTERVAL", 10)))
         self.monitor_targets = monitor_targets
         self.check_interval = MONITOR_CONFIG.get("CHECK_INTERVAL", 1800)
         self.error_limit = MONITOR_CONFIG.get("ERROR_COUNT", 10)
         self.error_wait = MONITOR_CONFIG.get("ERROR_RETRY_WAIT", 60)
+        self.error_backoff_max = MONITOR_CONFIG.get("ERROR_BACKOFF_MAX", 3600)
+        # 全局熔断：跨对象连续失败达到 ERROR_COUNT，或遇到限流/Cookie 失效时暂停全部拉取
+        self.global_breaker = CircuitBreaker("global", self.error_limit, self.error_wait, self.error_backoff_max)
+        # 单对象熔断：某个对象失败后只让它自己退避，其他对象照常轮询
+        self.target_breakers: Dict[str, CircuitBreaker] = {}
+        self._breaker_lock = threading.Lock()
+        # 本轮因熔断冷却被跳过拉取的对象，按熔断器的重试时间而不是常规间隔重新调度
+        self._breaker_skipped: Set[str] = set()
         self.hot_gate_days = MONITOR_CONFIG.get("HOT_GATE_DAYS", 5)
         self.first_run_window_hours = MONITOR_CONFIG.get("FIRST_RUN_WINDOW_HOURS", 24)
+        self.hot_gate_refresh_seconds = float(MONITOR_CONFIG.get("HOT_GATE_REFRESH_HOURS", 24)) * 3600
         self.next_hot_gate_check = 0
+        self.like_velocity_window = float(MONITOR_CONFIG.get("LIKE_VELOCITY_WINDOW_HOURS", 6)) * 3600
+        self.like_history_days = MONITOR_CONFIG.get("LIKE_HISTORY_DAYS", 14)
+        self.next_snapshot_compaction = 0
+        # 每个用户窗口期内未达标笔记的最早预计达标时间，math.inf 表示点赞已不再增长；
+        # 不在字典中表示样本不足、尚无法预测
+        self.hot_gate_eta: Dict[str, float] = {}
+        # 每个用户最近一次成功拉取到笔记的时间，点赞补充检查据此跳过刚拉取过的对象
+        self.last_fetch: Dict[str, float] = {}
+        self.poll_concurrency = max(1, int(MONITOR_CONFIG.get("POLL_CONCURRENCY", 4)))
+        self.host_limiter = HostLimiter(MONITOR_CONFIG.get("PER_HOST_CONCURRENCY", 4))
+        self.rate_limiter = RateLimiter(
+            MONITOR_CONFIG.get("REQUEST_RATE_LIMIT", 2.0),
+            MONITOR_CONFIG.get("REQUEST_BURST", 4),
+        )
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.poll_concurrency,
+            thread_name_prefix="xhs-poll",
+        )
+        self.fetch_backend = str(MONITOR_CONFIG.get("FETCH_BACKEND", "sync")).lower()
+        self.fetcher: Optional[AsyncNoteFetcher] = None
+        if self.fetch_backend == "aiohttp":
+            # 单个事件循环线程并发拉取全部对象，线程池只在 sync 模式下使用
+            self.fetcher = AsyncNoteFetcher(
+                cookie=cookie,
+                signer=self.signer,
+                host_limit=MONITOR_CONFIG.get("PER_HOST_CONCURRENCY", 4),
+                rate_limiter=self.rate_limiter,
+            )
+        self.schedule_history_days = MONITOR_CONFIG.get("SCHEDULE_HISTORY_DAYS", 30)
+        self.scheduler = PollScheduler(
+            base_interval=self.check_interval,
+            min_interval=MONITOR_CONFIG.get("MIN_CHECK_INTERVAL", 300),
+            max_interval=MONITOR_CONFIG.get("MAX_CHECK_INTERVAL", 7200),
+            adaptive=MONITOR_CONFIG.get("ADAPTIVE_SCHEDULE", True),
+        )
+        # 轮询超过预算时保存调用栈，并剖析下一轮
+        self.slow_cycle = SlowCycleWatchdog(
+            MONITOR_CONFIG.get("SLOW_CYCLE_SECONDS", 0),
+            MONITOR_CONFIG.get("LOG_DIR", "logs"),
+        )
+        self.targets_by_id: Dict[str, Dict] = {target.get("id"): target for target in monitor_targets}
+        # 所有对象的关键词规则启动时编译一次，字面词共用一个匹配器，每条笔记只扫描一遍
+        self.keyword_rules = KeywordRuleEngine(
+            TextNormalizer(
+                enabled=MONITOR_CONFIG.get("KEYWORD_NORMALIZE", True),
+                traditional_to_simplified=MONITOR_CONFIG.get("KEYWORD_T2S", False),
+            )
+        )
+        for user_id, target in self.targets_by_id.items():
+            self.keyword_rules.set_rules(user_id, target.get('keyword', []), target.get('exclude'))
+        self._load_posting_profiles()
+        for user_id in self.targets_by_id:
+            self.scheduler.schedule(user_id, 0)
         self._setup_logger()
         self._log_startup_info()
         
+    def _build_notifier(self) -> MultiNotifier:
+        notifiers = [
+            BarkClient(
+                base_url=BARK_CONFIG.get("BASE_URL", "https://api.day.app"),
+                device_key=BARK_CONFIG.get("DEVICE_KEY", ""),
+                group=BARK_CONFIG.get("GROUP", ""),
+                sound=BARK_CONFIG.get("SOUND", ""),
+                icon=BARK_CONFIG.get("ICON", ""),
+                timeout=BARK_CONFIG.get("TIMEOUT", 10),
+            )
+        ]
+        if WECOM_CONFIG.get("ENABLED"):
+            notifiers.append(
+                WecomMessage(
+                    corpid=WECOM_CONFIG.get("CORP_ID", ""),
+                    agentid=WECOM_CONFIG.get("AGENT_ID", 0),
+                    secret=WECOM_CONFIG.get("SECRET", ""),
+                    touser=WECOM_CONFIG.get("TO_USER", "@all"),
+                    timeout=WECOM_CONFIG.get("TIMEOUT", 10),
+                    token_cache_file=WECOM_CONFIG.get("TOKEN_CACHE_FILE", ".wecom_token.json"),
+                )
+            )
+        return MultiNotifier(notifiers)
+
     def send_error_notification(self, error_msg: str):
         time_str = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
         body = f"错误信息：{error_msg}\n告警时间：{time_str}"
-        self.notifier.send("异常告警", body, group="exception")
+        self.outbox.enqueue([
+            OutboxMessage(f"exception:{time.time_ns()}", "exception", "异常告警", body, push_group="exception"),
+        ])
     
+    @property
+    def client(self) -> XhsClient:
+        client = getattr(self._client_local, "client", None)
+        if client is None:
+            client = XhsClient(cookie=self.cookie, sign=self.signer.sign)
+            self._client_local.client = client
+        return client
+
     def get_user_notes(self, user_id: str) -> List[dict]:
+        permit = self._acquire_breaker(user_id)
+        if permit is None:
+            return []
         try:
-            res_data = self.client.get_user_notes(user_id)
-            self.error_count = 0
-            return res_data.get('notes', [])
-            
+            if self.fetcher is not None:
+                res_data = self.fetcher.submit(user_id).result()
+            else:
+                with self.host_limiter.acquire(XHS_API_HOST):
+                    self.rate_limiter.acquire()
+                    started = time.perf_counter()
+                    try:
+                        res_data = self.client.get_user_notes(user_id)
+                    finally:
+                        elapsed = time.perf_counter() - started
+                        FETCH_DURATION.observe(elapsed, target=user_id)
+                        TRACER.record("fetch", elapsed)
+            notes = self._extract_notes(res_data)
         except Exception as e:
-            error_msg = str(e)
-
-            logging.error("获取用户笔记失败: %s", error_msg)
-
-            time.sleep(self.error_wait)
-
-            self.error_count += 1
-
-            if self.error_count >= self.error_limit:
-                self.send_error_notification(f"API 请求失败\n详细信息：{error_msg}")
-                exit(-1)
-
+            self._record_fetch_failure(user_id, permit, e)
             return []
+        self._record_fetch_success(permit)
+        return notes
+
+    @staticmethod
+    def _extract_notes(res_data) -> List[dict]:
+        """
+        :raises DataFetchError: 响应不是 JSON 对象，例如代理返回的 502 页面（xhs 库此时直接返回 Response）
+        """
+        if not isinstance(res_data, dict):
+            status = getattr(res_data, "status_code", None)
+            text = getattr(res_data, "text", "") or ""
+            raise DataFetchError(f"接口返回无法解析：status={status} | body={str(text)[:200]}")
+        return res_data.get('notes') or []
+
+    def _acquire_breaker(self, user_id: str) -> Optional[FetchPermit]:
+        """
+        :return: 允许拉取时返回放行凭证，冷却中返回 None
+        """
+        breaker = self._target_breaker(user_id)
+        generation = None
+        global_generation = None
+        if breaker.cooldown_remaining() <= 0:
+            global_generation = self.global_breaker.admit()
+            if global_generation is not None:
+                generation = breaker.admit()
+                if generation is None:
+                    # 全局熔断可能刚为本次请求进入半开，没有真正发出请求就要撤回放行
+                    self.global_breaker.release(global_generation)
+        if generation is None:
+            logging.debug("熔断冷却中，跳过拉取：%s", user_id)
+            with self._breaker_lock:
+                self._breaker_skipped.add(user_id)
+            return None
+        with self._breaker_lock:
+            self._breaker_skipped.discard(user_id)
+        return FetchPermit(breaker, generation, global_generation)
+
+    def _record_fetch_success(self, permit: FetchPermit):
+        permit.breaker.record_success(permit.generation)
+        if self.global_breaker.record_success(permit.global_generation):
+            logging.info("接口请求恢复正常")
+
+    def _target_breaker(self, user_id: str) -> CircuitBreaker:
+        with self._breaker_lock:
+            breaker = self.target_breakers.get(user_id)
+            if breaker is None:
+                breaker = CircuitBreaker(user_id, 1, self.error_wait, self.error_backoff_max)
+                self.target_breakers[user_id] = breaker
+            return breaker
+
+    def _record_fetch_failure(self, user_id: str, permit: FetchPermit, error: Exception):
+        kind = classify_error(error)
+        FETCH_ERRORS.inc(target=user_id, kind=kind)
+        breaker = permit.breaker
+        breaker.record_failure(kind, generation=permit.generation)
+        logging.error(
+            "获取用户笔记失败：%s | 类型：%s | 冷却 %.0f 秒 | %s",
+            user_id,
+            kind,
+            breaker.cooldown_remaining(),
+            error,
+        )
+        # 限流和 Cookie 失效影响所有对象，直接全局熔断
+        # 打开前放行、仍在途的请求只记录错误类型，不会叠加退避或重复告警
+        opened = self.global_breaker.record_failure(
+            kind,
+            force_open=kind in (RATE_LIMITED, COOKIE_EXPIRED),
+            generation=permit.global_generation,
+        )
+        if opened:
+            cooldown = self.global_breaker.cooldown_remaining()
+            logging.error("全局熔断：暂停全部拉取 %.0f 秒 | 类型：%s", cooldown, kind)
+            self.send_error_notification(
+                f"API 请求失败，暂停拉取 {cooldown:.0f} 秒\n错误类型：{kind}\n详细信息：{error}"
+            )
 
     def run(self):
         logging.info("开始监控目标列表，共 %d 个监控对象", len(self.monitor_targets))
+        self.outbox.start()
+        self._start_metrics_server()
+        self._warm_up_signer()
+        try:
+            self._run_loop()
+        finally:
+            self.outbox.stop()
+
+    def _run_loop(self):
         while True:
-            for target in self.monitor_targets:
-                try:
-                    self.process_new_posts(target)
-                except Exception as exc:
-                    logging.exception("处理 %s 新笔记失败", target.get('nickname'))
-            now = time.time()
-            if now >= self.next_hot_gate_check:
-                logging.info("开始执行点赞达标检查")
-                try:
-                    self.process_hot_gate()
-                except Exception as exc:
-                    logging.exception("执行点赞达标检查失败")
-                self.next_hot_gate_check = now + self.DAILY_SECONDS
-            time.sleep(self.check_interval)
-
-    def process_new_posts(self, target: Dict):
+            try:
+                self._run_once()
+            except Exception:
+                # 单轮的任何异常都不能让监控进程退出
+                logging.exception("轮询循环异常，稍后继续")
+            self._sleep_until_next_due()
+
+    def _run_once(self):
+        self._reload_targets()
+        due_ids = self.scheduler.pop_due(time.time())
+        targets = [self.targets_by_id[user_id] for user_id in due_ids if user_id in self.targets_by_id]
+        if targets:
+            try:
+                self._run_cycle(targets)
+            finally:
+                # 中途出错时，已弹出调度堆但还没重新调度的对象按退避时间放回，避免永远不再轮询
+                retry_at = time.time() + self.error_wait
+                for target in targets:
+                    user_id = target.get("id")
+                    if user_id not in self.scheduler and user_id in self.targets_by_id:
+                        self.scheduler.schedule(user_id, retry_at)
+        now = time.time()
+        if now >= self.next_snapshot_compaction:
+            self.next_snapshot_compaction = now + 6 * 3600
+            self._compact_like_snapshots(now)
+        if self.hot_gate_refresh_seconds > 0 and now >= self.next_hot_gate_check:
+            try:
+                self.refresh_hot_gate()
+            except Exception as exc:
+                logging.exception("执行点赞达标补充检查失败")
+            self.next_hot_gate_check = now + self.hot_gate_refresh_seconds
+
+    def _run_cycle(self, targets: List[Dict]):
+        cycle_started = time.monotonic()
+        self.slow_cycle.begin()
+        try:
+            with self.slow_cycle.profile():
+                new_counts = self.poll_targets(targets)
+                with span("schedule"):
+                    self._reschedule(targets, new_counts)
+        finally:
+            cycle_elapsed = time.monotonic() - cycle_started
+            self.slow_cycle.end(cycle_elapsed)
+        CYCLE_DURATION.observe(cycle_elapsed)
+        CYCLE_TARGETS.set(len(targets))
+        logging.info("本轮轮询 %d 个监控对象，耗时 %.2f 秒", len(targets), cycle_elapsed)
+        # 各阶段为跨线程累计耗时；push 为上次统计以来后台投递的耗时
+        logging.info("本轮耗时分布：%s", format_breakdown(TRACER.collect()))
+        logging.info("签名统计：%s", json.dumps(self.signer.stats(), ensure_ascii=False))
+        logging.info("数据库统计：%s", json.dumps(self.db.stats(), ensure_ascii=False))
+        logging.info("推送统计：%s", json.dumps(self.outbox.stats(), ensure_ascii=False))
+
+    def _sleep_until_next_due(self):
+        wake_at = self.scheduler.next_due()
+        if self.hot_gate_refresh_seconds > 0:
+            wake_at = self.next_hot_gate_check if wake_at is None else min(wake_at, self.next_hot_gate_check)
+        if wake_at is None:
+            wake_at = time.time() + self.check_interval
+        if self.targets_watcher is not None:
+            wake_at = min(wake_at, time.time() + self.targets_reload_interval)
+        time.sleep(max(0.5, wake_at - time.time()))
+
+    def _reload_targets(self):
+        if self.targets_watcher is None:
+            return
+        targets = self.targets_watcher.poll()
+        if targets is not None:
+            self.apply_targets(targets)
+
+    def apply_targets(self, targets: List[Dict]):
+        """
+        增量应用新的监控对象列表：只重建新增、删除和变更对象的规则与状态，
+        签名服务、数据库、其余对象的熔断、调度和点赞预测保持不变
+        """
+        diff = diff_targets(self.targets_by_id, targets)
+        for user_id in diff.removed:
+            self.scheduler.remove(user_id)
+            self.keyword_rules.remove(user_id)
+            self.page_fingerprints.pop(user_id, None)
+            self.hot_gate_eta.pop(user_id, None)
+            self.last_fetch.pop(user_id, None)
+            with self._breaker_lock:
+                self.target_breakers.pop(user_id, None)
+                self._breaker_skipped.discard(user_id)
+        for old, new in diff.changed:
+            user_id = new.get("id")
+            if (old.get("keyword"), old.get("exclude")) != (new.get("keyword"), new.get("exclude")):
+                self.keyword_rules.set_rules(user_id, new.get("keyword", []), new.get("exclude"))
+            if old.get("hot_gate") != new.get("hot_gate"):
+                # 阈值变化后，下次拉取即使列表未变化也重新检查点赞并预测达标时间
+                self.page_fingerprints.pop(user_id, None)
+                self.hot_gate_eta.pop(user_id, None)
+        since_ts = int(time.time()) - int(self.schedule_history_days * 86400)
+        for target in diff.added:
+            user_id = target.get("id")
+            self.keyword_rules.set_rules(user_id, target.get("keyword", []), target.get("exclude"))
+            if user_id in self.watermarks:
+                history = self.db.get_publish_history(since_ts, user_id)
+                self.scheduler.update_profile(
+                    user_id,
+                    PostingProfile.from_publish_times(history.get(user_id, []), self.schedule_history_days),
+                )
+            self.scheduler.schedule(user_id, 0)
+        self.targets_by_id = {target.get("id"): target for target in targets}
+        self.monitor_targets = targets
+        if diff:
+            logging.info(
+                "监控对象已更新：新增 %d，删除 %d，变更 %d，共 %d 个",
+                len(diff.added),
+                len(diff.removed),
+                len(diff.changed),
+                len(targets),
+            )
+
+    def _load_posting_profiles(self):
+        since_ts = int(time.time()) - int(self.schedule_history_days * 86400)
+        history = self.db.get_publish_history(since_ts)
+        for user_id in self.targets_by_id:
+            # 从未入库过的新对象没有可学习的数据，按基准间隔轮询
+            if user_id not in self.watermarks:
+                continue
+            self.scheduler.update_profile(
+                user_id,
+                PostingProfile.from_publish_times(history.get(user_id, []), self.schedule_history_days),
+            )
+
+    def _reschedule(self, targets: List[Dict], new_counts: Dict[str, int]):
+        now = time.time()
+        since_ts = int(now) - int(self.schedule_history_days * 86400)
+        for target in targets:
+            user_id = target.get("id")
+            cooldown = max(
+                self._target_breaker(user_id).cooldown_remaining(now),
+                self.global_breaker.cooldown_remaining(now),
+            )
+            with self._breaker_lock:
+                skipped = user_id in self._breaker_skipped
+                self._breaker_skipped.discard(user_id)
+            if skipped:
+                # 未真正拉取的对象在熔断重试时间后尽快回访；半开时冷却为 0，探测请求本轮已结束，
+                # 稍等片刻即可重试。加入抖动避免所有对象同时涌入
+                delay = cooldown + random.uniform(1.0, max(5.0, self.error_wait / 10))
+                self.scheduler.schedule(user_id, now + delay)
+                logging.debug("熔断跳过，%.0f 秒后重试：%s", delay, target.get('nickname', user_id))
+                continue
+            had_new_notes = new_counts.get(user_id, 0) > 0
+            if had_new_notes:
+                history = self.db.get_publish_history(since_ts, user_id)
+                self.scheduler.update_profile(
+                    user_id,
+                    PostingProfile.from_publish_times(history.get(user_id, []), self.schedule_history_days),
+                )
+            eta = self.hot_gate_eta.get(user_id)
+            interval = self.scheduler.reschedule(
+                user_id,
+                now,
+                had_new_notes,
+                not_before=now + cooldown,
+                not_after=eta if eta is not None and eta > now else None,
+            )
+            logging.debug("下次轮询：%s | 间隔 %.0f 秒", target.get('nickname', user_id), interval)
+
+    def _start_metrics_server(self):
+        port = int(MONITOR_CONFIG.get("METRICS_PORT", 0) or 0)
+        if port <= 0:
+            return
+        # 各组件已有的累计统计在抓取时读取，不在热路径上重复计数
+        REGISTRY.register_callback(
+            "db_statements_total", "执行的 SQL 语句数", lambda: self.db.stats()["statements"], "counter"
+        )
+        REGISTRY.register_callback(
+            "db_commits_total", "提交的事务数", lambda: self.db.stats()["commits"], "counter"
+        )
+        REGISTRY.register_callback(
+            "db_statement_seconds_total",
+            "SQL 语句累计耗时",
+            lambda: self.db.stats()["statement_time_ms"] / 1000,
+            "counter",
+        )
+        for key in ("enqueued", "sent", "pushes", "saved_pushes", "retried", "dropped"):
+            REGISTRY.register_callback(
+                f"outbox_{key}_total",
+                f"推送发件箱 {key} 计数",
+                lambda key=key: self.outbox.stats()[key],
+                "counter",
+            )
+        REGISTRY.register_callback(
+            "outbox_pending", "待投递的推送数量", lambda: self.db.get_outbox_counts().get("pending", 0)
+        )
+        REGISTRY.register_callback("monitor_targets", "监控对象数量", lambda: len(self.targets_by_id))
+        try:
+            self.metrics_server = start_metrics_server(port, MONITOR_CONFIG.get("METRICS_HOST", "127.0.0.1"))
+        except OSError:
+            logging.exception("指标服务启动失败：端口 %s", port)
+
+    def _warm_up_signer(self):
+        cookies = parse_cookie(self.cookie)
+        try:
+            self.signer.warm_up(cookies.get("a1", ""), cookies.get("web_session", ""))
+        except Exception:
+            logging.exception("签名页面预热失败，将在首次签名时重试")
+
+    def poll_targets(self, targets: List[Dict]) -> Dict[str, int]:
+        """
+        :return: user_id -> 本次新入库的笔记数量
+        """
+        new_counts: Dict[str, int] = {}
+        for target, notes in self.fetch_targets(targets):
+            try:
+                new_counts[target.get("id")] = self.process_new_posts(target, notes)
+            except Exception as exc:
+                logging.exception("处理 %s 新笔记失败", target.get('nickname'))
+        return new_counts
+
+    def refresh_hot_gate(self):
+        """
+        点赞达标的低频补充检查：常规轮询已在每次拉取时检查点赞阈值，这里只重新拉取
+        窗口期内仍有未达标笔记、且超过补充检查间隔没有拉取过的监控对象。
+        """
+        since_ts = int(time.time()) - self.hot_gate_days * 86400
+        stale_before = time.time() - self.hot_gate_refresh_seconds
+        # 点赞已不再增长、预计补充检查周期内不会达标的对象跳过，交给常规轮询
+        horizon = time.time() + self.hot_gate_refresh_seconds
+        pending_users = self.db.get_users_with_open_hot_gate_notes(since_ts)
+        targets = [
+            target
+            for target in self.monitor_targets
+            if target.get("id") in pending_users
+            and self.last_fetch.get(target.get("id"), 0) < stale_before
+            and self.hot_gate_eta.get(target.get("id"), 0) <= horizon
+        ]
+        if not targets:
+            return
+        logging.info("开始执行点赞达标补充检查，共 %d 个监控对象", len(targets))
+        self.poll_targets(targets)
+
+    def fetch_targets(self, targets: List[Dict]) -> Iterator[Tuple[Dict, List[dict]]]:
+        """
+        并发拉取多个监控对象的笔记，按完成顺序返回 (target, notes)。
+        拉取在线程池中进行，调用方在当前线程处理结果，数据库写入与推送保持串行。
+        """
+        if self.fetcher is not None:
+            yield from self._fetch_targets_async(targets)
+            return
+        if self.poll_concurrency <= 1 or len(targets) <= 1:
+            for target in targets:
+                yield target, self.get_user_notes(target.get("id"))
+            return
+        futures = {
+            self.executor.submit(self.get_user_notes, target.get("id")): target
+            for target in targets
+        }
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+    def _fetch_targets_async(self, targets: List[Dict]) -> Iterator[Tuple[Dict, List[dict]]]:
+        futures = {}
+        for target in targets:
+            user_id = target.get("id")
+            permit = self._acquire_breaker(user_id)
+            if permit is None:
+                yield target, []
+                continue
+            futures[self.fetcher.submit(user_id)] = (target, permit)
+        for future in as_completed(futures):
+            target, permit = futures[future]
+            try:
+                notes = self._extract_notes(future.result())
+            except Exception as e:
+                self._record_fetch_failure(target.get("id"), permit, e)
+                yield target, []
+                continue
+            self._record_fetch_success(permit)
+            yield target, notes
+
+    def process_new_posts(self, target: Dict, notes: Optional[List[dict]] = None) -> int:
+        """
+        处理一次拉取到的笔记列表：入库、新笔记关键词提醒，以及窗口期内笔记的点赞阈值检查
+        :return: 新入库的笔记数量
+        """
         user_id = target.get("id")
-        notes = self.get_user_notes(user_id)
+        if notes is None:
+            notes = self.get_user_notes(user_id)
         if not notes:
-            return
-        notes.sort(key=lambda x: self._extract_timestamp(x) or 0)
-        last_time_str = self.db.get_latest_note_time(user_id)
-        last_time = self._to_datetime(last_time_str) if last_time_str else None
+            return 0
+        self.last_fetch[user_id] = time.time()
+        fingerprint = self._page_fingerprint(notes)
+        if self.page_fingerprints.get(user_id) == fingerprint:
+            logging.debug("笔记列表无变化，跳过处理：%s", target.get('nickname', user_id))
+            # 列表没变说明点赞也没涨，已过期的预计达标时间不再可信，交回常规间隔调度
+            eta = self.hot_gate_eta.get(user_id)
+            if eta is not None and eta <= time.time():
+                self.hot_gate_eta.pop(user_id, None)
+            return 0
+        with span("parse"):
+            views = [NoteView.from_raw(note, user_id) for note in notes]
+        with span("db"):
+            states = self.db.get_note_states([view.note_id for view in views])
+        last_time = self.watermarks.get(user_id)
+        last_ts = int(last_time.timestamp()) if last_time else None
         first_run = last_time is None
-        window_start = None
+        window_start_ts = None
         if first_run:
-            window_start = datetime.now(timezone.utc) - timedelta(hours=self.first_run_window_hours)
-
-        for note in notes:
-            published_at = self._extract_datetime(note)
-            if not published_at:
-                published_at = datetime.now(timezone.utc)
-            note_record = json.loads(json.dumps(note))
-            note_record["published_time"] = published_at.astimezone(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
-            is_new = self.db.add_note_if_not_exists(note_record)
+            window_start_ts = int(time.time()) - self.first_run_window_hours * 3600
 
-            if not is_new:
+        now_ts = int(time.time())
+        for view in views:
+            if view.published_ts is not None:
+                continue
+            state = states.get(view.note_id)
+            if state and state.published_time is not None:
+                logging.debug(
+                    "API 未提供发布时间，使用数据库记录：note_id=%s | published_time=%s",
+                    view.note_id,
+                    self._from_epoch(state.published_time),
+                )
+                view.published_ts = state.published_time
+            else:
+                view.published_ts = now_ts
+        views.sort(key=lambda view: view.published_ts)
+        hot_gate_since = now_ts - self.hot_gate_days * 86400
+        snapshots = []
+        for view in views:
+            if view.like_count is None or view.published_ts < hot_gate_since:
                 continue
-            if first_run and window_start and published_at < window_start:
-                logging.info("首次运行忽略历史笔记: %s - %s", target.get('nickname', user_id), note.get('display_title'))
+            state = states.get(view.note_id)
+            if state is None or state.last_like_count != view.like_count:
+                snapshots.append((view.note_id, now_ts, view.like_count))
+        # 笔记入库与对应的关键词提醒在同一个事务里提交：进程在两者之间退出时，
+        # 笔记不会已入库（之后不再算新笔记）而提醒却丢失
+        with self.db.transaction():
+            with span("db"):
+                new_note_ids = self.db.upsert_notes(user_id, views)
+                self.db.add_like_snapshots(snapshots)
+            messages = self._keyword_messages(target, views, new_note_ids, first_run, window_start_ts, last_ts)
+            with span("enqueue"):
+                self.outbox.enqueue(messages)
+        self._advance_watermark(user_id, [view.published_ts for view in views])
+        self.page_fingerprints[user_id] = fingerprint
+
+        with span("hot_gate"):
+            self.check_hot_gate(target, views, states)
+            self._forecast_hot_gate(target, views, states, now_ts)
+        return len(new_note_ids)
+
+    def _keyword_messages(
+        self,
+        target: Dict,
+        views: List[NoteView],
+        new_note_ids: Set[str],
+        first_run: bool,
+        window_start_ts: Optional[int],
+        last_ts: Optional[int],
+    ) -> List[OutboxMessage]:
+        """
+        :return: 本次新入库笔记命中关键词规则后要推送的消息
+        """
+        user_id = target.get("id")
+        messages = []
+        for view in views:
+            if view.note_id not in new_note_ids:
                 continue
-            if not first_run and last_time and published_at <= last_time:
+            if first_run and window_start_ts and view.published_ts < window_start_ts:
+                logging.info("首次运行忽略历史笔记: %s - %s", target.get('nickname', user_id), view.title)
                 continue
-
-            title = note.get('display_title') or note.get('title') or ''
-            keywords = target.get('keyword', [])
-            matched = [kw for kw in keywords if kw and kw in title]
-            if not matched:
+            if not first_run and last_ts and view.published_ts <= last_ts:
                 continue
 
-            url = f"https://www.xiaohongshu.com/explore/{note.get('note_id')}"
-            body = f"命中关键词：{', '.join(matched)}\n标题：{title}"
-            group = "重要更新提醒"
-            title_text = f"{target.get('nickname', user_id)} 有新动态"
-            logging.info("关键词命中：%s | 标题：%s", matched, title)
-            if not self.notifier.send(title_text, body, url, group=group):
-                logging.error("关键词推送失败：%s", url)
-
-    def process_hot_gate(self):
-        since = datetime.now(timezone.utc) - timedelta(days=self.hot_gate_days)
-        for target in self.monitor_targets:
-            user_id = target.get("id")
-            notes = self.get_user_notes(user_id)
-            if not notes:
+            title = view.title
+            with span("match"):
+                matches = self.keyword_rules.evaluate(user_id, view.match_text)
+            for match in matches:
+                body = f"命中关键词：{', '.join(match.keywords)}\n标题：{title}"
+                title_text = f"{target.get('nickname', user_id)} 有新动态"
+                logging.info("关键词命中：%s | 分组：%s | 标题：%s", match.keywords, match.group, title)
+                dedupe_key = f"keyword:{view.note_id}"
+                if match.group != DEFAULT_GROUP:
+                    dedupe_key = f"{dedupe_key}:{match.group}"
+                messages.append(OutboxMessage(
+                    dedupe_key=dedupe_key,
+                    kind="keyword",
+                    title=title_text,
+                    body=body,
+                    url=view.url,
+                    push_group=match.group,
+                    user_id=user_id,
+                    note_id=view.note_id,
+                ))
+        return messages
+
+    def check_hot_gate(self, target: Dict, views: List[NoteView], states: Dict[str, NoteState]):
+        """
+        用本次轮询拿到的点赞数检查窗口期内笔记是否达到阈值，states 为处理前预取的入库状态
+        """
+        user_id = target.get("id")
+        hot_gate = target.get("hot_gate", 0)
+        since_ts = int(time.time()) - self.hot_gate_days * 86400
+        logging.debug("检查点赞阈值：%s | 阈值：%s", target.get('nickname', user_id), hot_gate)
+        messages = []
+        for view in views:
+            note_id = view.note_id
+            if view.published_ts < since_ts:
                 continue
-            hot_gate = target.get("hot_gate", 0)
-            logging.info("检查点赞阈值：%s | 阈值：%s", target.get('nickname', user_id), hot_gate)
-            for note in notes:
-                note_id = note.get('note_id')
-                stored_time_str = self.db.get_note_published_time(note_id)
-                published_at = self._extract_datetime(note)
-                if not published_at and stored_time_str:
-                    fallback_time = self._to_datetime(stored_time_str)
-                    if fallback_time:
-                        logging.debug(
-                            "API 未提供发布时间，使用数据库记录：note_id=%s | published_time=%s",
-                            note_id,
-                            fallback_time,
-                        )
-                        published_at = fallback_time
-                if not published_at:
-                    logging.debug("无法解析发布时间，跳过点赞检查：%s", note_id)
-                    continue
-                if published_at < since:
-                    continue
-
-                note_record = json.loads(json.dumps(note))
-                note_record.setdefault("user", {})
-                note_record["user"].setdefault("user_id", user_id)
-                note_record["published_time"] = published_at.astimezone(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
-                self.db.add_note_if_not_exists(note_record)
-
-                if stored_time_str:
-                    stored_dt = self._to_datetime(stored_time_str)
-                    if stored_dt and published_at > stored_dt:
-                        logging.debug(
-                            "检测到发布时间更新：note_id=%s | old=%s | new=%s",
-                            note_id,
-                            stored_dt,
-                            published_at,
-                        )
-                        self.db.update_published_time(
-                            note_id,
-                            published_at.strftime('%Y-%m-%d %H:%M:%S'),
-                        )
-                else:
-                    logging.debug("记录新笔记发布时间：%s -> %s", note_id, published_at)
-                    self.db.update_published_time(
-                        note_id,
-                        published_at.strftime('%Y-%m-%d %H:%M:%S'),
-                    )
-                like_count = self._extract_like_count(note)
-                raw_like = note.get('liked_count')
-                if raw_like is None:
-                    raw_like = (note.get('note_card') or {}).get('liked_count')
-                if raw_like is None:
-                    raw_like = (note.get('interact_info') or {}).get('liked_count')
-                logging.debug("点赞原始数据：note_id=%s | raw=%s", note_id, raw_like)
-                previous_like = self.db.get_last_like_count(note_id)
-                if previous_like is not None and like_count != previous_like:
-                    logging.debug(
-                        "点赞数变化：note_id=%s | old=%s | new=%s",
-                        note_id,
-                        previous_like,
-                        like_count,
-                    )
-                self.db.update_last_like_count(note_id, like_count)
+            state = states.get(note_id)
+            if view.like_count is None:
+                logging.debug("点赞原始数据无法解析：note_id=%s | raw=%s", note_id, view.raw_like)
+                continue
+            like_count = view.like_count
+            previous_like = state.last_like_count if state else None
+            if previous_like is not None and like_count != previous_like:
                 logging.debug(
-                    "点赞数据：note_id=%s | like_count=%s", note_id, like_count
+                    "点赞数变化：note_id=%s | old=%s | new=%s",
+                    note_id,
+                    previous_like,
+                    like_count,
                 )
-                if like_count < hot_gate:
-                    logging.debug("点赞未达标：%s | 点赞：%s", note_id, like_count)
-                    continue
-                if self.db.is_hot_gate_notified(note_id):
-                    logging.debug("已推送过点赞提醒：%s", note_id)
-                    continue
-                url = f"https://www.xiaohongshu.com/explore/{note_id}"
-                body = f"点赞数：{like_count}\n时间：{published_at.strftime('%Y-%m-%d %H:%M:%S')}"
-                group = "点赞达标提醒"
-                title_text = f"{target.get('nickname', user_id)} 达到 {hot_gate}"
-                if self.notifier.send(title_text, body, url, group=group):
-                    self.db.mark_hot_gate_notified(note_id, user_id, like_count)
-                    logging.info("点赞达标：%s | 点赞：%s", title_text, like_count)
-                else:
-                    logging.error("点赞达标推送失败：%s", url)
-
-    def _extract_timestamp(self, note: Dict) -> Optional[int]:
-        value = note.get('time') or note.get('timestamp')
-        if not value:
-            card = note.get('note_card') or {}
-            value = card.get('time') or card.get('timestamp')
-        if isinstance(value, str):
-            cleaned = value.strip()
-            if cleaned.isdigit():
-                return int(cleaned)
-            if cleaned.endswith('Z'):
-                cleaned = cleaned[:-1] + '+00:00'
-            try:
-                dt = datetime.fromisoformat(cleaned)
-                return int(dt.timestamp())
-            except Exception:
-                pass
-        if isinstance(value, (int, float)):
-            return int(value)
-        return None
-
-    def _extract_datetime(self, note: Dict) -> Optional[datetime]:
-        ts = self._extract_timestamp(note)
-        if ts:
-            try:
-                return datetime.fromtimestamp(ts, tz=timezone.utc)
-            except Exception:
-                return None
-        text = note.get('published_time') or note.get('time')
-        if isinstance(text, str):
-            cleaned = text.strip()
-            if cleaned.endswith('Z'):
-                cleaned = cleaned[:-1] + '+00:00'
-            for fmt in ('%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S'):
-                try:
-                    return datetime.strptime(cleaned, fmt).replace(tzinfo=timezone.utc)
-                except Exception:
-                    continue
-            try:
-                return datetime.fromisoformat(cleaned).astimezone(timezone.utc)
-            except Exception:
-                return None
-        return None
-
-    def _extract_like_count(self, note: Dict) -> int:
-        value = note.get('liked_count')
-        if value is None:
-            card = note.get('note_card') or {}
-            value = card.get('liked_count')
-        if value is None:
-            detail = note.get('interact_info') or {}
-            value = detail.get('liked_count')
-        return self._parse_like_count(value)
-
-    def _parse_like_count(self, raw) -> int:
-        if raw is None:
-            return 0
-        if isinstance(raw, (int, float)):
-            return int(raw)
-        if not isinstance(raw, str):
-            return 0
-
-        text = raw.strip().lower().replace(',', '')
-        multiplier = 1
-
-        if text.endswith('万') or text.endswith('w'):
-            multiplier = 10000
-            text = text[:-1]
-        elif text.endswith('千') or text.endswith('k'):
-            multiplier = 1000
-            text = text[:-1]
-
+            if like_count < hot_gate:
+                continue
+            if state and state.hot_gate_notified:
+                logging.debug("已推送过点赞提醒：%s", note_id)
+                continue
+            body = f"点赞数：{like_count}\n时间：{view.published_at.strftime('%Y-%m-%d %H:%M:%S')}"
+            title_text = f"{target.get('nickname', user_id)} 达到 {hot_gate}"
+            logging.info("点赞达标：%s | 点赞：%s", title_text, like_count)
+            # 送达后才写入 hot_gate_notifications，未送达前重复入队会按 dedupe_key 忽略
+            messages.append(OutboxMessage(
+                dedupe_key=f"hot_gate:{note_id}",
+                kind="hot_gate",
+                title=title_text,
+                body=body,
+                url=view.url,
+                push_group="点赞达标提醒",
+                user_id=user_id,
+                note_id=note_id,
+                like_count=like_count,
+            ))
+        self.outbox.enqueue(messages)
+
+    def _forecast_hot_gate(self, target: Dict, views: List[NoteView], states: Dict[str, NoteState], now_ts: int):
+        """
+        根据点赞快照估算窗口期内未达标笔记的增速，记录最早的预计达标时间供调度使用
+        """
+        user_id = target.get("id")
+        hot_gate = target.get("hot_gate", 0)
+        since_ts = now_ts - self.hot_gate_days * 86400
+        open_views = [
+            view
+            for view in views
+            if hot_gate
+            and view.published_ts >= since_ts
+            and view.like_count is not None
+            and view.like_count < hot_gate
+            and not (states.get(view.note_id) and states[view.note_id].hot_gate_notified)
+        ]
+        if not open_views:
+            self.hot_gate_eta[user_id] = math.inf
+            return
+        history = self.db.get_like_snapshots(
+            [view.note_id for view in open_views],
+            int(now_ts - self.like_velocity_window),
+        )
+        histories = []
+        for view in open_views:
+            points = history.get(view.note_id, [])
+            if not points or points[-1][0] != now_ts:
+                points = points + [(now_ts, view.like_count)]
+            histories.append(points)
+        eta = earliest_crossing(histories, hot_gate)
+        if eta is None:
+            self.hot_gate_eta.pop(user_id, None)
+            return
+        self.hot_gate_eta[user_id] = eta
+        if eta != math.inf:
+            logging.debug(
+                "预计点赞达标：%s | 阈值：%s | 预计时间：%s",
+                target.get('nickname', user_id),
+                hot_gate,
+                datetime.fromtimestamp(eta).strftime('%Y-%m-%d %H:%M:%S'),
+            )
+
+    def _compact_like_snapshots(self, now: float):
         try:
-            amount = float(text)
-            return int(amount * multiplier)
+            removed = self.db.compact_like_snapshots(
+                raw_before_ts=int(now - 86400),
+                bucket_seconds=3600,
+                expire_before_ts=int(now - self.like_history_days * 86400),
+            )
         except Exception:
-            return 0
+            logging.exception("点赞快照降采样失败")
+            return
+        if removed:
+            logging.info("点赞快照降采样：删除 %d 条", removed)
+
+    def _page_fingerprint(self, notes: List[dict]) -> int:
+        return hash(tuple((note.get('note_id'), raw_like_count(note)) for note in notes))
 
-    def _to_datetime(self, value: str) -> Optional[datetime]:
-        if not value:
+    def _advance_watermark(self, user_id: str, published_times: List[int]):
+        if not published_times:
+            return
+        latest = self._from_epoch(max(published_times))
+        current = self.watermarks.get(user_id)
+        if latest and (current is None or latest > current):
+            self.watermarks[user_id] = latest
+
+    def _from_epoch(self, value: Optional[int]) -> Optional[datetime]:
+        if value is None:
             return None
-        cleaned = value.strip()
-        if cleaned.endswith('Z'):
-            cleaned = cleaned[:-1] + '+00:00'
-        for fmt in ('%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S'):
-            try:
-                return datetime.strptime(cleaned, fmt).replace(tzinfo=timezone.utc)
-            except Exception:
-                continue
         try:
-            return datetime.fromisoformat(cleaned).astimezone(timezone.utc)
+            return datetime.fromtimestamp(value, tz=timezone.utc)
         except Exception:
             return None
-        return None
 
     def _setup_logger(self):
         log_dir = MONITOR_CONFIG.get("LOG_DIR", "logs")
@@ -359,10 +868,17 @@ class XHSMonitor:
                 "keyword_count": len([kw for kw in target.get("keyword", []) if kw]),
                 "hot_gate": target.get("hot_gate"),
             })
+        sanitized_wecom = {
+            "ENABLED": bool(WECOM_CONFIG.get("ENABLED")),
+            "AGENT_ID": WECOM_CONFIG.get("AGENT_ID"),
+            "TO_USER": WECOM_CONFIG.get("TO_USER"),
+            "SECRET_PROVIDED": bool(WECOM_CONFIG.get("SECRET")),
+        }
         config_snapshot = {
             "version": APP_VERSION,
             "monitor": sanitized_monitor,
             "bark": sanitized_bark,
+            "wecom": sanitized_wecom,
             "targets": target_summaries,
             "cookie_present": bool(XHS_CONFIG.get("COOKIE")),
         }
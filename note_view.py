@@ -0,0 +1,184 @@
+from datetime import datetime, timezone
+from typing import List, Optional
+
+
+def to_epoch(value, assume_local: bool = False) -> Optional[int]:
+    """
+    把数据库或接口中的时间值统一转换为秒级时间戳
+    :param value: 秒/毫秒时间戳，或 "%Y-%m-%d %H:%M:%S" / ISO 格式字符串
+    :param assume_local: 不带时区的字符串按本地时间解析，否则按 UTC 解析
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, str):
+        cleaned = value.strip()
+        if not cleaned:
+            return None
+        try:
+            value = float(cleaned)
+        except ValueError:
+            if cleaned.endswith('Z'):
+                cleaned = cleaned[:-1] + '+00:00'
+            try:
+                parsed = datetime.fromisoformat(cleaned)
+            except ValueError:
+                return None
+            if parsed.tzinfo is None and not assume_local:
+                parsed = parsed.replace(tzinfo=timezone.utc)
+            return int(parsed.timestamp())
+    if isinstance(value, (int, float)):
+        # 小红书接口的时间戳多为毫秒
+        if value > 1e11:
+            value = value / 1000
+        return int(value)
+    return None
+
+
+def raw_like_count(note: dict):
+    value = note.get('liked_count')
+    if value is None:
+        card = note.get('note_card') or {}
+        value = card.get('liked_count')
+    if value is None:
+        detail = note.get('interact_info') or {}
+        value = detail.get('liked_count')
+    return value
+
+
+def parse_like_count(raw) -> Optional[int]:
+    """
+    解析点赞数，支持 "1.2万"、"3k"、"1,234" 等写法
+    :return: 点赞数，无法解析时为 None
+    """
+    if raw is None or isinstance(raw, bool):
+        return None
+    if isinstance(raw, (int, float)):
+        return int(raw)
+    if not isinstance(raw, str):
+        return None
+
+    text = raw.strip().lower().replace(',', '')
+    multiplier = 1
+
+    if text.endswith('万') or text.endswith('w'):
+        multiplier = 10000
+        text = text[:-1]
+    elif text.endswith('千') or text.endswith('k'):
+        multiplier = 1000
+        text = text[:-1]
+
+    try:
+        amount = float(text)
+        return int(amount * multiplier)
+    except Exception:
+        return None
+
+
+def extract_tags(note: dict) -> List[str]:
+    tags = note.get('tag_list')
+    if tags is None:
+        tags = (note.get('note_card') or {}).get('tag_list') or []
+    names = []
+    for tag in tags:
+        name = tag.get('name') if isinstance(tag, dict) else tag
+        if name:
+            names.append(str(name))
+    return names
+
+
+def extract_timestamp(note: dict) -> Optional[int]:
+    value = note.get('time') or note.get('timestamp')
+    if not value:
+        card = note.get('note_card') or {}
+        value = card.get('time') or card.get('timestamp')
+    if not value:
+        value = note.get('published_time')
+    return to_epoch(value)
+
+
+class NoteView:
+    """
+    接口返回的笔记在监控流程中的统一视图：每条原始笔记只解析一次，
+    之后关键词匹配、点赞检查与入库都直接读取这里的字段。
+    """
+
+    __slots__ = (
+        "note_id",
+        "user_id",
+        "title",
+        "desc",
+        "tags",
+        "note_type",
+        "published_ts",
+        "like_count",
+        "raw_like",
+        "raw",
+    )
+
+    def __init__(
+        self,
+        note_id: str,
+        user_id: str,
+        title: str,
+        note_type: str,
+        published_ts: Optional[int],
+        like_count: Optional[int],
+        raw_like=None,
+        raw: Optional[dict] = None,
+        desc: str = "",
+        tags: Optional[List[str]] = None,
+    ):
+        self.note_id = note_id
+        self.user_id = user_id
+        self.title = title
+        self.desc = desc
+        self.tags = tags or []
+        self.note_type = note_type
+        self.published_ts = published_ts
+        self.like_count = like_count
+        self.raw_like = raw_like
+        self.raw = raw
+
+    @classmethod
+    def from_raw(cls, note: dict, user_id: str = "") -> "NoteView":
+        raw_like = raw_like_count(note)
+        card = note.get('note_card') or {}
+        return cls(
+            note_id=note.get('note_id'),
+            user_id=(note.get('user') or {}).get('user_id') or user_id,
+            title=note.get('display_title') or note.get('title') or '',
+            note_type=note.get('type') or 'normal',
+            published_ts=extract_timestamp(note),
+            like_count=parse_like_count(raw_like),
+            raw_like=raw_like,
+            raw=note,
+            # 用户笔记列表接口通常只有标题，正文和话题在笔记详情中才有
+            desc=note.get('desc') or card.get('desc') or '',
+            tags=extract_tags(note),
+        )
+
+    @property
+    def published_at(self) -> Optional[datetime]:
+        if self.published_ts is None:
+            return None
+        try:
+            return datetime.fromtimestamp(self.published_ts, tz=timezone.utc)
+        except Exception:
+            return None
+
+    @property
+    def match_text(self) -> str:
+        """关键词匹配的文本：标题、正文与话题，逐行拼接避免跨字段误命中。"""
+        if not self.desc and not self.tags:
+            return self.title
+        return "\n".join(part for part in (self.title, self.desc, *self.tags) if part)
+
+    @property
+    def url(self) -> str:
+        return f"https://www.xiaohongshu.com/explore/{self.note_id}"
+
+    def __repr__(self) -> str:
+        return (
+            f"NoteView(note_id={self.note_id!r}, published_ts={self.published_ts!r}, "
+            f"like_count={self.like_count!r}, title={self.title!r})"
+        )
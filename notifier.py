@@ -0,0 +1,106 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Collection, Dict, List, Optional
+
+
+class Notifier:
+    """推送渠道的统一接口，发件箱只依赖 send()。"""
+
+    name = "notifier"
+
+    def send(self, title: str, body: str, url: str = "", group: str = None) -> bool:
+        raise NotImplementedError
+
+    def deliver(
+        self,
+        title: str,
+        body: str,
+        url: str = "",
+        group: str = None,
+        skip: Collection[str] = (),
+    ) -> Dict[str, bool]:
+        """
+        按渠道发送，供发件箱逐渠道记录送达情况
+        :param skip: 已送达、本次不再发送的渠道名
+        :return: 本次尝试的渠道名 -> 是否发送成功
+        """
+        if self.name in skip:
+            return {}
+        return {self.name: self.send(title, body, url, group=group)}
+
+    def close(self):
+        pass
+
+
+class MultiNotifier(Notifier):
+    """
+    多渠道推送：各渠道并发发送，总耗时约等于最慢的渠道。send() 任一渠道成功即视为成功；
+    发件箱使用 deliver()，逐渠道记录结果，只重试失败的渠道。
+    """
+
+    name = "multi"
+
+    def __init__(self, notifiers: List[Notifier]):
+        self.notifiers = list(notifiers)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+
+    def send(self, title: str, body: str, url: str = "", group: str = None) -> bool:
+        return any(self.send_all(title, body, url, group).values())
+
+    def deliver(
+        self,
+        title: str,
+        body: str,
+        url: str = "",
+        group: str = None,
+        skip: Collection[str] = (),
+    ) -> Dict[str, bool]:
+        return self.send_all(title, body, url, group, skip=skip)
+
+    def send_all(
+        self,
+        title: str,
+        body: str,
+        url: str = "",
+        group: str = None,
+        skip: Collection[str] = (),
+    ) -> Dict[str, bool]:
+        """
+        :param skip: 不发送的渠道名
+        :return: 渠道名 -> 是否发送成功
+        """
+        notifiers = [notifier for notifier in self.notifiers if notifier.name not in skip]
+        if len(notifiers) <= 1:
+            return {notifier.name: self._send_one(notifier, title, body, url, group) for notifier in notifiers}
+        executor = self._get_executor()
+        futures = {
+            notifier.name: executor.submit(self._send_one, notifier, title, body, url, group)
+            for notifier in notifiers
+        }
+        return {name: future.result() for name, future in futures.items()}
+
+    def close(self):
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+        for notifier in self.notifiers:
+            notifier.close()
+
+    def _send_one(self, notifier: Notifier, title: str, body: str, url: str, group: str) -> bool:
+        try:
+            return notifier.send(title, body, url, group=group)
+        except Exception:
+            logging.exception("推送渠道发送异常：%s", notifier.name)
+            return False
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=len(self.notifiers),
+                    thread_name_prefix="notify",
+                )
+            return self._executor
@@ -0,0 +1,230 @@
+import logging
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from db import Database, OutboxMessage
+from metrics import DETECTION_LAG
+from tracing import span
+
+
+class OutboxDispatcher:
+    """
+    推送发件箱：监控流程只把消息写入 notification_outbox，由后台线程投递。
+    投递失败按指数退避重试，超过最大次数后标记为 failed；未送达的消息在重启后继续投递。
+    dedupe_key 唯一，同一条提醒重复入队不会重复推送。
+
+    合并推送：同一监控对象、同一分组的提醒，在上次推送后的 coalesce_window 秒内
+    到达的会顺延到窗口结束；届时待推送的条数达到 coalesce_threshold 就合并为一条汇总推送。
+    """
+
+    def __init__(
+        self,
+        db: Database,
+        notifier,
+        max_attempts: int = 10,
+        retry_wait: float = 30,
+        retry_max: float = 3600,
+        retention_days: float = 7,
+        batch_size: int = 50,
+        idle_interval: float = 30,
+        coalesce_window: float = 60,
+        coalesce_threshold: int = 3,
+    ):
+        self.db = db
+        self.notifier = notifier
+        self.max_attempts = max(1, int(max_attempts))
+        self.retry_wait = max(1.0, float(retry_wait))
+        self.retry_max = max(self.retry_wait, float(retry_max))
+        self.retention_seconds = float(retention_days) * 86400
+        self.batch_size = max(1, int(batch_size))
+        self.idle_interval = max(1.0, float(idle_interval))
+        self.coalesce_window = max(0.0, float(coalesce_window))
+        self.coalesce_threshold = max(2, int(coalesce_threshold))
+        # (user_id, push_group) -> 最近一次推送时间
+        self._last_push: Dict[Tuple[str, str], float] = {}
+
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._next_purge = 0.0
+
+        self._stats_lock = threading.Lock()
+        self.enqueued_count = 0
+        self.sent_count = 0
+        self.push_count = 0
+        self.coalesced_count = 0
+        self.saved_push_count = 0
+        self.retry_count = 0
+        self.dropped_count = 0
+
+    def enqueue(self, messages: Iterable[OutboxMessage]) -> int:
+        """
+        :return: 实际新增的消息数量（重复的 dedupe_key 不计入）
+        """
+        added = self.db.enqueue_notifications(messages)
+        if added:
+            with self._stats_lock:
+                self.enqueued_count += added
+            self._wakeup.set()
+        return added
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="outbox-dispatcher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = 10):
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def stats(self) -> Dict[str, int]:
+        with self._stats_lock:
+            return {
+                "enqueued": self.enqueued_count,
+                "sent": self.sent_count,
+                "pushes": self.push_count,
+                "coalesced": self.coalesced_count,
+                "saved_pushes": self.saved_push_count,
+                "retried": self.retry_count,
+                "dropped": self.dropped_count,
+            }
+
+    def dispatch_due(self) -> int:
+        """
+        投递一批已到期的消息
+        :return: 本批处理的消息数量
+        """
+        now = time.time()
+        messages = self.db.get_due_notifications(int(now), self.batch_size)
+        for batch in self._coalesce(messages, now):
+            if self._stopping.is_set():
+                break
+            self._deliver(batch)
+        return len(messages)
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                handled = self.dispatch_due()
+                self._purge_if_due()
+            except Exception:
+                logging.exception("推送发件箱投递异常")
+                handled = 0
+            if handled >= self.batch_size:
+                continue
+            self._wakeup.wait(self._idle_timeout())
+            self._wakeup.clear()
+
+    def _idle_timeout(self) -> float:
+        next_time = self.db.get_next_notification_time()
+        if next_time is None:
+            return self.idle_interval
+        return min(self.idle_interval, max(0.5, next_time - time.time()))
+
+    def _coalesce(self, messages: List[OutboxMessage], now: float) -> List[List[OutboxMessage]]:
+        """
+        按 (user_id, push_group) 分组：窗口内的消息顺延，达到阈值的合并为一批
+        :return: 每个元素为一次推送要投递的消息
+        """
+        if self.coalesce_window <= 0:
+            return [[message] for message in messages]
+        groups: Dict[Tuple[str, str], List[OutboxMessage]] = {}
+        batches: List[List[OutboxMessage]] = []
+        for message in messages:
+            if not message.user_id or message.kind == "exception":
+                batches.append([message])
+                continue
+            groups.setdefault((message.user_id, message.push_group), []).append(message)
+        for key, group in groups.items():
+            window_end = self._last_push.get(key, 0) + self.coalesce_window
+            if now < window_end:
+                self.db.defer_notifications([message.id for message in group], int(window_end) + 1)
+                logging.debug("合并窗口内顺延推送：%s | %d 条", key, len(group))
+                continue
+            if len(group) >= self.coalesce_threshold:
+                batches.append(group)
+            else:
+                batches.extend([message] for message in group)
+        return batches
+
+    def _deliver(self, batch: List[OutboxMessage]):
+        first = batch[0]
+        if len(batch) == 1:
+            title, body, url = first.title, first.body, first.url or ""
+        else:
+            title, body, url = self._summary(batch)
+        # 合并的消息可能各自送达过不同渠道，只跳过所有消息都已送达的渠道
+        delivered = set.intersection(*(self._channels(message) for message in batch))
+        try:
+            with span("push"):
+                results = self.notifier.deliver(title, body, url, group=first.push_group, skip=delivered)
+            failed = sorted(name for name, sent in results.items() if not sent)
+            delivered.update(name for name, sent in results.items() if sent)
+            ok = not failed
+            error = "" if ok else f"推送接口返回失败：{', '.join(failed)}"
+        except Exception as exc:
+            ok = False
+            error = str(exc)
+        if ok:
+            self.db.mark_notifications_sent(batch)
+            self._observe_detection_lag(batch)
+            if first.user_id:
+                self._last_push[(first.user_id, first.push_group)] = time.time()
+            with self._stats_lock:
+                self.sent_count += len(batch)
+                self.push_count += 1
+                if len(batch) > 1:
+                    self.coalesced_count += len(batch)
+                    self.saved_push_count += len(batch) - 1
+            logging.info("推送成功：%s | %s | %d 条", first.kind, title, len(batch))
+            return
+
+        attempts = max(message.attempts for message in batch) + 1
+        keys = ", ".join(message.dedupe_key for message in batch)
+        delivered_channels = ",".join(sorted(delivered))
+        if attempts >= self.max_attempts:
+            self.db.mark_notifications_failed(batch, error, None, delivered_channels)
+            with self._stats_lock:
+                self.dropped_count += len(batch)
+            logging.error("推送失败且不再重试：%s | 已尝试 %d 次 | %s", keys, attempts, error)
+            return
+        delay = min(self.retry_max, self.retry_wait * (2 ** (attempts - 1)))
+        self.db.mark_notifications_failed(batch, error, int(time.time() + delay), delivered_channels)
+        with self._stats_lock:
+            self.retry_count += len(batch)
+        logging.warning("推送失败，%.0f 秒后重试：%s | 第 %d 次 | %s", delay, keys, attempts, error)
+
+    @staticmethod
+    def _channels(message: OutboxMessage) -> Set[str]:
+        return {name for name in (message.delivered_channels or "").split(",") if name}
+
+    def _observe_detection_lag(self, batch: List[OutboxMessage]):
+        now = time.time()
+        for message in batch:
+            if not message.note_id:
+                continue
+            published_time = self.db.get_note_published_time(message.note_id)
+            if published_time:
+                DETECTION_LAG.observe(max(0.0, now - published_time), kind=message.kind)
+
+    def _summary(self, batch: List[OutboxMessage]) -> Tuple[str, str, str]:
+        first = batch[0]
+        title = f"{first.title}（{len(batch)} 条）"
+        lines = [f"{index}. {message.body.replace(chr(10), ' | ')}" for index, message in enumerate(batch, 1)]
+        url = f"https://www.xiaohongshu.com/user/profile/{first.user_id}"
+        return title, "\n".join(lines), url
+
+    def _purge_if_due(self):
+        now = time.time()
+        if self.retention_seconds <= 0 or now < self._next_purge:
+            return
+        self._next_purge = now + 3600
+        removed = self.db.purge_sent_notifications(int(now - self.retention_seconds))
+        if removed:
+            logging.debug("清理已送达的推送记录：%d 条", removed)
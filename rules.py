@@ -0,0 +1,162 @@
+import logging
+import re
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Pattern, Tuple, Union
+
+from matcher import KeywordMatcher, TextNormalizer
+
+DEFAULT_GROUP = "重要更新提醒"
+
+
+class KeywordRule(NamedTuple):
+    any_terms: FrozenSet[str]
+    all_terms: FrozenSet[str]
+    not_terms: FrozenSet[str]
+    patterns: Tuple[Pattern, ...]
+    group: str
+
+
+class RuleMatch(NamedTuple):
+    group: str
+    keywords: List[str]
+
+
+def _as_list(value) -> List[str]:
+    if value is None:
+        return []
+    if isinstance(value, str):
+        value = [value]
+    return [str(item).strip() for item in value if item is not None and str(item).strip()]
+
+
+class KeywordRuleEngine:
+    """
+    监控对象的关键词规则，启动（或重新加载配置）时编译一次：
+
+    - 字符串：普通关键词，命中即提醒；
+    - dict：any（任一命中）、all（全部命中）、not / exclude（命中任一则排除）、
+      regex（正则，任一命中）、group（推送分组，默认「重要更新提醒」）。
+
+    所有字面词都编译进同一个 Aho-Corasick 匹配器，每条笔记只扫描一遍，
+    再按命中的词找出可能满足的规则逐条判断；不含字面正向词的规则（仅正则）每次都判断。
+    """
+
+    def __init__(self, normalizer: Optional[TextNormalizer] = None, default_group: str = DEFAULT_GROUP):
+        self.normalizer = normalizer or TextNormalizer(enabled=False)
+        self.default_group = default_group
+        self.matcher = KeywordMatcher(self.normalizer)
+        self._rules: Dict[str, List[KeywordRule]] = {}
+        # owner -> 正向字面词 -> 引用它的规则下标
+        self._trigger_index: Dict[str, Dict[str, List[int]]] = {}
+        # owner -> 只能靠正则触发的规则下标
+        self._always_check: Dict[str, List[int]] = {}
+
+    def __contains__(self, owner: str) -> bool:
+        return owner in self._rules
+
+    def set_rules(
+        self,
+        owner: str,
+        keyword_config: Iterable[Union[str, dict]],
+        exclude: Optional[Iterable[str]] = None,
+    ):
+        """
+        编译并替换某个对象的全部规则
+        :param keyword_config: 监控对象的 keyword 字段
+        :param exclude: 对该对象所有规则生效的排除词
+        """
+        self.remove(owner)
+        common_exclude = frozenset(_as_list(exclude))
+        rules: List[KeywordRule] = []
+        for item in keyword_config or []:
+            rule = self._compile_rule(owner, item, common_exclude)
+            if rule is not None:
+                rules.append(rule)
+
+        trigger_index: Dict[str, List[int]] = {}
+        always_check: List[int] = []
+        # 按规则顺序登记字面词，命中结果因此大致保持配置顺序
+        terms: Dict[str, None] = {}
+        for index, rule in enumerate(rules):
+            positive = rule.any_terms | rule.all_terms
+            terms.update(dict.fromkeys(sorted(positive)))
+            terms.update(dict.fromkeys(sorted(rule.not_terms)))
+            if positive:
+                for term in positive:
+                    trigger_index.setdefault(term, []).append(index)
+            else:
+                always_check.append(index)
+
+        self.matcher.add_many(terms, owner)
+        self._rules[owner] = rules
+        self._trigger_index[owner] = trigger_index
+        self._always_check[owner] = always_check
+
+    def remove(self, owner: str):
+        self.matcher.remove_owner(owner)
+        self._rules.pop(owner, None)
+        self._trigger_index.pop(owner, None)
+        self._always_check.pop(owner, None)
+
+    def evaluate(self, owner: str, text: str) -> List[RuleMatch]:
+        """
+        :return: 按分组合并的命中结果，keywords 为命中的字面词与正则匹配到的片段
+        """
+        rules = self._rules.get(owner)
+        if not rules or not text:
+            return []
+        ordered_hits = self.matcher.match(text, owner)
+        hits = set(ordered_hits)
+        candidates = set(self._always_check[owner])
+        trigger_index = self._trigger_index[owner]
+        for term in hits:
+            candidates.update(trigger_index.get(term, ()))
+        if not candidates:
+            return []
+
+        normalized = None
+        grouped: Dict[str, List[str]] = {}
+        for index in sorted(candidates):
+            rule = rules[index]
+            if rule.not_terms and not rule.not_terms.isdisjoint(hits):
+                continue
+            if rule.all_terms and not rule.all_terms <= hits:
+                continue
+            if rule.any_terms and rule.any_terms.isdisjoint(hits):
+                continue
+            labels = [term for term in ordered_hits if term in rule.any_terms or term in rule.all_terms]
+            if rule.patterns:
+                if normalized is None:
+                    normalized = self.normalizer(text)
+                matched = [match.group(0) for match in (pattern.search(normalized) for pattern in rule.patterns) if match]
+                if not matched:
+                    continue
+                labels.extend(matched)
+            keywords = grouped.setdefault(rule.group, [])
+            keywords.extend(label for label in labels if label not in keywords)
+        return [RuleMatch(group, keywords) for group, keywords in grouped.items()]
+
+    def _compile_rule(self, owner: str, item: Union[str, dict], common_exclude: FrozenSet[str]) -> Optional[KeywordRule]:
+        if isinstance(item, str):
+            keyword = item.strip()
+            if not keyword:
+                return None
+            return KeywordRule(frozenset([keyword]), frozenset(), common_exclude, (), self.default_group)
+        if not isinstance(item, dict):
+            logging.error("无法识别的关键词规则：%s | %r", owner, item)
+            return None
+
+        patterns = []
+        for expression in _as_list(item.get("regex")):
+            try:
+                # 正则匹配归一化后的文本，统一忽略大小写
+                patterns.append(re.compile(expression, re.IGNORECASE))
+            except re.error as exc:
+                logging.error("关键词正则无效，已忽略：%s | %s | %s", owner, expression, exc)
+        any_terms = frozenset(_as_list(item.get("any")))
+        all_terms = frozenset(_as_list(item.get("all")))
+        not_terms = frozenset(_as_list(item.get("not")) + _as_list(item.get("exclude"))) | common_exclude
+        if not any_terms and not all_terms and not patterns:
+            logging.error("关键词规则缺少 any / all / regex，已忽略：%s | %r", owner, item)
+            return None
+        group = str(item.get("group") or self.default_group)
+        return KeywordRule(any_terms, all_terms, not_terms, tuple(patterns), group)
@@ -0,0 +1,128 @@
+import heapq
+import itertools
+import math
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class PostingProfile:
+    """某个账号的发帖习惯：日均发帖数与按小时分布的活跃权重（均值为 1）。"""
+
+    __slots__ = ("rate_per_day", "hour_weights", "sample_size")
+
+    def __init__(self, rate_per_day: float, hour_weights: List[float], sample_size: int):
+        self.rate_per_day = rate_per_day
+        self.hour_weights = hour_weights
+        self.sample_size = sample_size
+
+    @classmethod
+    def from_publish_times(cls, publish_times: Iterable[int], history_days: float) -> "PostingProfile":
+        counts = [0] * 24
+        total = 0
+        for ts in publish_times:
+            counts[time.localtime(ts).tm_hour] += 1
+            total += 1
+        # 拉普拉斯平滑，避免样本少时某些小时权重为 0
+        smoothing = 1.0
+        denominator = total + 24 * smoothing
+        weights = [(count + smoothing) * 24 / denominator for count in counts]
+        return cls(total / max(history_days, 1.0), weights, total)
+
+
+class PollScheduler:
+    """
+    自适应轮询调度：用最小堆维护每个监控对象的下次到期时间。
+    轮询间隔以 base_interval 为基准，日均发帖 1 条的账号约等于基准间隔，
+    发帖越频繁、当前小时越活跃则间隔越短，长期不发帖的账号退避到 max_interval。
+    """
+
+    def __init__(
+        self,
+        base_interval: float,
+        min_interval: float,
+        max_interval: float,
+        adaptive: bool = True,
+    ):
+        self.base_interval = float(base_interval)
+        self.min_interval = float(min(min_interval, base_interval))
+        self.max_interval = float(max(max_interval, base_interval))
+        self.adaptive = adaptive
+        self._heap: List[Tuple[float, int, str]] = []
+        self._due: Dict[str, float] = {}
+        self._profiles: Dict[str, PostingProfile] = {}
+        self._counter = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._due)
+
+    def __contains__(self, user_id: str) -> bool:
+        return user_id in self._due
+
+    def schedule(self, user_id: str, due: float):
+        self._due[user_id] = due
+        heapq.heappush(self._heap, (due, next(self._counter), user_id))
+
+    def remove(self, user_id: str):
+        # 堆中的旧条目在弹出时按 _due 校验后丢弃
+        self._due.pop(user_id, None)
+        self._profiles.pop(user_id, None)
+
+    def next_due(self) -> Optional[float]:
+        self._discard_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: float) -> List[str]:
+        due_ids = []
+        while True:
+            self._discard_stale()
+            if not self._heap or self._heap[0][0] > now:
+                return due_ids
+            _, _, user_id = heapq.heappop(self._heap)
+            del self._due[user_id]
+            due_ids.append(user_id)
+
+    def update_profile(self, user_id: str, profile: PostingProfile):
+        self._profiles[user_id] = profile
+
+    def interval_for(self, user_id: str, now: float, had_new_notes: bool = False) -> float:
+        if not self.adaptive:
+            return self.base_interval
+        if had_new_notes:
+            # 刚发过笔记的账号常常连续更新，下一轮尽快回访
+            return self.min_interval
+        profile = self._profiles.get(user_id)
+        if profile is None or profile.sample_size == 0:
+            return self.max_interval if profile is not None else self.base_interval
+        hour_weight = profile.hour_weights[time.localtime(now).tm_hour]
+        activity = math.sqrt(profile.rate_per_day) * hour_weight
+        if activity <= 0:
+            return self.max_interval
+        return min(self.max_interval, max(self.min_interval, self.base_interval / activity))
+
+    def reschedule(
+        self,
+        user_id: str,
+        now: float,
+        had_new_notes: bool = False,
+        not_before: float = 0.0,
+        not_after: Optional[float] = None,
+    ) -> float:
+        """
+        :param not_before: 最早的下次轮询时间，例如熔断冷却结束的时间
+        :param not_after: 希望不晚于该时间回访，例如笔记预计点赞达标的时间；仍不短于最小间隔
+        :return: 距下次轮询的秒数
+        """
+        due = now + self.interval_for(user_id, now, had_new_notes)
+        if not_after is not None:
+            due = min(due, max(now + self.min_interval, not_after))
+        due = max(due, not_before)
+        self.schedule(user_id, due)
+        return due - now
+
+    def _discard_stale(self):
+        heap = self._heap
+        while heap:
+            due, _, user_id = heap[0]
+            if self._due.get(user_id) == due:
+                return
+            heapq.heappop(heap)
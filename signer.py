@@ -0,0 +1,318 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from playwright.async_api import async_playwright
+
+from metrics import SIGN_DURATION, SIGN_FAILURES
+from tracing import TRACER
+
+BASE_DIR = Path(__file__).resolve().parent
+STEALTH_JS_PATH = BASE_DIR / "public" / "stealth.min.js"
+HOME_URL = "https://www.xiaohongshu.com"
+SIGN_READY_JS = "() => typeof window._webmsxyw === 'function'"
+SIGN_JS = "([url, data]) => window._webmsxyw(url, data)"
+
+
+class SignatureUnavailable(Exception):
+    """签名页面多次重建后仍无法生成 x-s/x-t。"""
+
+
+class _PageSlot:
+    __slots__ = ("index", "page", "cookies", "generation", "uses")
+
+    def __init__(self, index: int):
+        self.index = index
+        self.page = None
+        self.cookies: Optional[Tuple[str, str]] = None
+        self.generation = -1
+        self.uses = 0
+
+
+class XhsSigner:
+    """
+    常驻浏览器签名服务：Chromium 只启动一次，内部维护 pool_size 个预热好的签名页面，
+    签名请求排队取用空闲页面并发执行。Playwright 运行在独立的事件循环线程中，
+    sign() 可被任意线程并发调用，sign_async() 供 asyncio 代码使用。
+    """
+
+    def __init__(
+        self,
+        pool_size: int = 2,
+        headless: Optional[bool] = None,
+        wait_ms: Optional[int] = None,
+        max_retries: int = 3,
+        ready_timeout_ms: int = 15000,
+    ):
+        if headless is None:
+            headless = os.getenv("XHS_HEADLESS", "1").lower() not in {"0", "false", "no"}
+        if wait_ms is None:
+            wait_ms = int(os.getenv("XHS_SIGN_WAIT_MS", "1000"))
+        self.pool_size = max(1, int(pool_size))
+        self.headless = headless
+        self.wait_ms = wait_ms
+        self.max_retries = max(1, max_retries)
+        self.ready_timeout_ms = ready_timeout_ms
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._slots: Optional[asyncio.Queue] = None
+        self._browser_lock: Optional[asyncio.Lock] = None
+
+        self._playwright = None
+        self._browser = None
+        self._context = None
+        # 每次重启浏览器递增，页面所属代数不一致即视为失效
+        self._generation = 0
+        self._context_cookies: Optional[Tuple[str, str]] = None
+
+        self._stats_lock = threading.Lock()
+        self.sign_count = 0
+        self.failure_count = 0
+        self.recycle_count = 0
+        self.total_latency = 0.0
+        self.last_latency = 0.0
+
+    def sign(self, uri, data=None, a1: str = "", web_session: str = "") -> Dict[str, str]:
+        loop = self._ensure_loop()
+        future = asyncio.run_coroutine_threadsafe(
+            self._sign(uri, data, a1 or "", web_session or ""), loop
+        )
+        return future.result()
+
+    async def sign_async(self, uri, data=None, a1: str = "", web_session: str = "") -> Dict[str, str]:
+        loop = self._ensure_loop()
+        coro = self._sign(uri, data, a1 or "", web_session or "")
+        if asyncio.get_running_loop() is loop:
+            return await coro
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+
+    def warm_up(self, a1: str = "", web_session: str = "", timeout: Optional[float] = None):
+        """提前打开全部签名页面，避免第一轮轮询承担冷启动开销。"""
+        loop = self._ensure_loop()
+        future = asyncio.run_coroutine_threadsafe(self._warm_up(a1 or "", web_session or ""), loop)
+        future.result(timeout=timeout)
+
+    def stats(self) -> Dict[str, float]:
+        with self._stats_lock:
+            avg = self.total_latency / self.sign_count if self.sign_count else 0.0
+            return {
+                "pool_size": self.pool_size,
+                "sign_count": self.sign_count,
+                "failure_count": self.failure_count,
+                "recycle_count": self.recycle_count,
+                "last_latency_ms": round(self.last_latency * 1000, 2),
+                "avg_latency_ms": round(avg * 1000, 2),
+            }
+
+    def close(self):
+        loop = self._loop
+        if not loop or not loop.is_running():
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), loop).result(timeout=10)
+        except Exception as exc:
+            logging.debug("关闭签名浏览器失败: %s", exc)
+        loop.call_soon_threadsafe(loop.stop)
+        if self._thread:
+            self._thread.join(timeout=5)
+        self._loop = None
+        self._thread = None
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        if self._loop and self._loop.is_running():
+            return self._loop
+        with self._start_lock:
+            if self._loop and self._loop.is_running():
+                return self._loop
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+
+            def _run():
+                asyncio.set_event_loop(loop)
+                self._browser_lock = asyncio.Lock()
+                self._slots = asyncio.Queue()
+                for index in range(self.pool_size):
+                    self._slots.put_nowait(_PageSlot(index))
+                loop.call_soon(ready.set)
+                loop.run_forever()
+
+            thread = threading.Thread(target=_run, name="xhs-signer", daemon=True)
+            thread.start()
+            ready.wait()
+            self._loop = loop
+            self._thread = thread
+            return loop
+
+    async def _warm_up(self, a1: str, web_session: str):
+        slots: List[_PageSlot] = [await self._slots.get() for _ in range(self.pool_size)]
+        try:
+            results = await asyncio.gather(
+                *(self._ensure_page(slot, a1, web_session) for slot in slots),
+                return_exceptions=True,
+            )
+        finally:
+            for slot in slots:
+                self._slots.put_nowait(slot)
+        failed = [r for r in results if isinstance(r, Exception)]
+        if failed:
+            raise failed[0]
+        logging.info("签名页面池已预热：%d 个页面", self.pool_size)
+
+    async def _sign(self, uri, data, a1: str, web_session: str) -> Dict[str, str]:
+        started = time.perf_counter()
+        last_err = None
+        slot = await self._slots.get()
+        try:
+            for attempt in range(self.max_retries):
+                generation = self._generation
+                try:
+                    page = await self._ensure_page(slot, a1, web_session)
+                    if not await page.evaluate(SIGN_READY_JS):
+                        raise RuntimeError("window._webmsxyw 不存在")
+                    encrypt_params = await page.evaluate(SIGN_JS, [uri, data])
+                    slot.uses += 1
+                    self._record_latency(time.perf_counter() - started)
+                    return {"x-s": encrypt_params["X-s"], "x-t": str(encrypt_params["X-t"])}
+                except Exception as exc:
+                    last_err = exc
+                    logging.warning(
+                        "签名失败（页面 %d，第 %d 次），重建签名页面: %s",
+                        slot.index,
+                        attempt + 1,
+                        exc,
+                    )
+                    # 第一次失败只换页面，再失败则连浏览器一起重启
+                    await self._recycle(slot, generation, full=attempt > 0)
+        finally:
+            self._slots.put_nowait(slot)
+        with self._stats_lock:
+            self.failure_count += 1
+        SIGN_FAILURES.inc()
+        raise SignatureUnavailable(f"重试了这么多次还是无法签名成功，寄寄寄 | last_error: {last_err}")
+
+    def _record_latency(self, elapsed: float):
+        with self._stats_lock:
+            self.sign_count += 1
+            self.total_latency += elapsed
+            self.last_latency = elapsed
+        SIGN_DURATION.observe(elapsed)
+        TRACER.record("sign", elapsed)
+        logging.debug("签名耗时：%.1f ms", elapsed * 1000)
+
+    async def _ensure_page(self, slot: _PageSlot, a1: str, web_session: str):
+        await self._ensure_browser(a1, web_session)
+        if slot.page is None or slot.page.is_closed() or slot.generation != self._generation:
+            await self._open_page(slot)
+        elif slot.cookies != (a1, web_session):
+            # cookie 变化时只需重新加载页面，不用重建
+            await slot.page.reload(wait_until="domcontentloaded")
+            await self._wait_ready(slot.page)
+        slot.cookies = (a1, web_session)
+        return slot.page
+
+    async def _ensure_browser(self, a1: str, web_session: str):
+        async with self._browser_lock:
+            if self._browser is None or not self._browser.is_connected():
+                await self._launch_browser()
+            if self._context_cookies != (a1, web_session):
+                await self._apply_cookies(a1, web_session)
+
+    async def _launch_browser(self):
+        if not STEALTH_JS_PATH.exists():
+            raise FileNotFoundError(f"stealth script missing: {STEALTH_JS_PATH}")
+        if self._playwright is None:
+            self._playwright = await async_playwright().start()
+        launch_kwargs = {}
+        if os.getenv("XHS_NO_SANDBOX", "").strip():
+            launch_kwargs["args"] = ["--no-sandbox"]
+        # 常见：未安装浏览器（需要 `playwright install`）或 Linux 依赖缺失（需要 `playwright install-deps`）
+        self._browser = await self._playwright.chromium.launch(headless=self.headless, **launch_kwargs)
+        self._context = await self._browser.new_context()
+        await self._context.add_init_script(path=str(STEALTH_JS_PATH))
+        self._context_cookies = None
+        self._generation += 1
+        logging.info("签名浏览器已启动")
+
+    async def _open_page(self, slot: _PageSlot):
+        if slot.page is not None and not slot.page.is_closed():
+            try:
+                await slot.page.close()
+            except Exception:
+                pass
+        slot.page = None
+        page = await self._context.new_page()
+        generation = self._generation
+        try:
+            await page.goto(HOME_URL, wait_until="domcontentloaded")
+            await page.reload(wait_until="domcontentloaded")
+            await asyncio.sleep(self.wait_ms / 1000.0)
+            await self._wait_ready(page)
+        except BaseException:
+            # 页面还没挂到 slot 上，_recycle 关不到它，这里关掉避免在常驻浏览器里留下孤儿标签页
+            try:
+                await page.close()
+            except Exception:
+                pass
+            raise
+        slot.page = page
+        slot.generation = generation
+        slot.uses = 0
+
+    async def _apply_cookies(self, a1: str, web_session: str):
+        cookies = [
+            {"name": "a1", "value": a1, "domain": ".xiaohongshu.com", "path": "/"},
+        ]
+        if web_session:
+            cookies.append({"name": "web_session", "value": web_session, "domain": ".xiaohongshu.com", "path": "/"})
+        await self._context.add_cookies(cookies)
+        self._context_cookies = (a1, web_session)
+
+    async def _wait_ready(self, page):
+        await page.wait_for_function(SIGN_READY_JS, timeout=self.ready_timeout_ms)
+
+    async def _recycle(self, slot: _PageSlot, generation: int, full: bool = False):
+        with self._stats_lock:
+            self.recycle_count += 1
+        page, slot.page = slot.page, None
+        slot.cookies = None
+        if page is not None:
+            try:
+                await page.close()
+            except Exception:
+                pass
+        if full:
+            async with self._browser_lock:
+                # 其他页面可能已经重启过浏览器，此时不再重复重启
+                if generation == self._generation:
+                    await self._close_browser()
+
+    async def _close_browser(self):
+        browser, self._browser, self._context = self._browser, None, None
+        self._context_cookies = None
+        if browser is not None:
+            try:
+                await browser.close()
+            except Exception:
+                pass
+
+    async def _shutdown(self):
+        for _ in range(self.pool_size):
+            slot = await self._slots.get()
+            if slot.page is not None:
+                try:
+                    await slot.page.close()
+                except Exception:
+                    pass
+                slot.page = None
+        await self._close_browser()
+        if self._playwright is not None:
+            try:
+                await self._playwright.stop()
+            finally:
+                self._playwright = None
@@ -0,0 +1,88 @@
+import json
+import logging
+import os
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+
+class TargetsDiff(NamedTuple):
+    added: List[Dict]
+    removed: List[str]
+    changed: List[Tuple[Dict, Dict]]
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.changed)
+
+
+def load_targets(path: str) -> List[Dict]:
+    """
+    读取监控对象文件：JSON 数组，元素格式与 config.py 中的 MONITOR_TARGETS 相同
+    :raises ValueError: 文件格式不正确、缺少 id 或 id 重复
+    """
+    with open(path, "r", encoding="utf-8") as fp:
+        data = json.load(fp)
+    if isinstance(data, dict):
+        data = data.get("targets")
+    if not isinstance(data, list):
+        raise ValueError("监控对象文件应为 JSON 数组")
+    seen = set()
+    for target in data:
+        if not isinstance(target, dict) or not target.get("id"):
+            raise ValueError(f"监控对象缺少 id：{target!r}")
+        if target["id"] in seen:
+            raise ValueError(f"监控对象 id 重复：{target['id']}")
+        seen.add(target["id"])
+    return data
+
+
+def diff_targets(current: Dict[str, Dict], targets: List[Dict]) -> TargetsDiff:
+    """
+    :param current: 正在使用的 user_id -> target
+    :param targets: 新的监控对象列表
+    """
+    incoming = {target["id"]: target for target in targets}
+    added = [target for user_id, target in incoming.items() if user_id not in current]
+    removed = [user_id for user_id in current if user_id not in incoming]
+    changed = [
+        (current[user_id], target)
+        for user_id, target in incoming.items()
+        if user_id in current and current[user_id] != target
+    ]
+    return TargetsDiff(added, removed, changed)
+
+
+class TargetsFileWatcher:
+    """按修改时间与大小检测监控对象文件的变化，内容无效时保留上一次的配置。"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._signature: Optional[Tuple[float, int]] = None
+
+    def _stat(self) -> Optional[Tuple[float, int]]:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def load(self) -> Optional[List[Dict]]:
+        """
+        立即读取文件并记录当前版本
+        :return: 监控对象列表，文件不存在或无效时为 None
+        """
+        self._signature = self._stat()
+        if self._signature is None:
+            return None
+        try:
+            return load_targets(self.path)
+        except (OSError, ValueError) as exc:
+            logging.error("读取监控对象文件失败，继续使用当前配置：%s | %s", self.path, exc)
+            return None
+
+    def poll(self) -> Optional[List[Dict]]:
+        """
+        :return: 文件有变化且内容有效时返回新的监控对象列表，否则为 None
+        """
+        signature = self._stat()
+        if signature is None or signature == self._signature:
+            return None
+        return self.load()
@@ -0,0 +1,66 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+
+class RateLimiter:
+    """
+    令牌桶限速器
+    :param rate: 每秒允许的请求数，<= 0 表示不限速
+    :param burst: 允许的突发请求数量
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = float(rate or 0)
+        self.burst = max(1, int(burst or 1))
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """预占一个令牌，返回调用方还需等待的秒数。"""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self):
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+
+class HostLimiter:
+    """按域名限制同时进行的请求数量，limit <= 0 表示不限制。"""
+
+    def __init__(self, limit: int):
+        self.limit = int(limit or 0)
+        self._semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    def _semaphore(self, host: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            semaphore = self._semaphores.get(host)
+            if semaphore is None:
+                semaphore = threading.BoundedSemaphore(self.limit)
+                self._semaphores[host] = semaphore
+            return semaphore
+
+    @contextmanager
+    def acquire(self, host: str):
+        if self.limit <= 0:
+            yield
+            return
+        semaphore = self._semaphore(host)
+        semaphore.acquire()
+        try:
+            yield
+        finally:
+            semaphore.release()
@@ -0,0 +1,154 @@
+import cProfile
+import io
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple
+
+
+class Tracer:
+    """
+    轻量的分阶段耗时统计：各阶段（签名、拉取、入库、匹配、推送等）累计耗时与次数，
+    每轮轮询结束时取出一次。多个线程同时记录时耗时会累加，因此总和可能超过本轮实际耗时。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals: Dict[str, list] = {}
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def record(self, name: str, elapsed: float):
+        with self._lock:
+            total = self._totals.get(name)
+            if total is None:
+                self._totals[name] = [elapsed, 1]
+            else:
+                total[0] += elapsed
+                total[1] += 1
+
+    def collect(self) -> Dict[str, Tuple[float, int]]:
+        """
+        :return: 上次取出以来各阶段的 (累计秒数, 次数)，取出后清零
+        """
+        with self._lock:
+            totals, self._totals = self._totals, {}
+        return {name: (value[0], value[1]) for name, value in totals.items()}
+
+
+TRACER = Tracer()
+span = TRACER.span
+
+
+def format_breakdown(totals: Dict[str, Tuple[float, int]]) -> str:
+    if not totals:
+        return "无"
+    ordered = sorted(totals.items(), key=lambda item: item[1][0], reverse=True)
+    return " | ".join(f"{name} {seconds:.2f}s/{count}次" for name, (seconds, count) in ordered)
+
+
+class SlowCycleWatchdog:
+    """
+    慢轮询诊断：轮询超过 budget 秒仍未结束时，把所有线程的调用栈写到 dump_dir；
+    本轮结束后若确实超时，下一轮在 cProfile 下运行并保存结果，便于事后分析。
+    """
+
+    def __init__(self, budget: float, dump_dir: str, keep_files: int = 20):
+        self.budget = float(budget or 0)
+        self.dump_dir = dump_dir
+        self.keep_files = keep_files
+        self._timer: Optional[threading.Timer] = None
+        self._profile_next = False
+
+    @property
+    def enabled(self) -> bool:
+        return self.budget > 0
+
+    def begin(self):
+        if not self.enabled:
+            return
+        self._cancel_timer()
+        self._timer = threading.Timer(self.budget, self._dump_stacks)
+        self._timer.name = "slow-cycle-watchdog"
+        self._timer.daemon = True
+        self._timer.start()
+
+    def end(self, elapsed: float):
+        if not self.enabled:
+            return
+        self._cancel_timer()
+        if elapsed > self.budget:
+            logging.warning("本轮轮询耗时 %.2f 秒，超过预算 %g 秒，下一轮将记录性能剖析", elapsed, self.budget)
+            self._profile_next = True
+
+    @contextmanager
+    def profile(self) -> Iterator[None]:
+        """上一轮超时则在 cProfile 下执行本轮，只剖析调用线程。"""
+        if not self._profile_next:
+            yield
+            return
+        self._profile_next = False
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            self._save_profile(profiler)
+
+    def _cancel_timer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _dump_stacks(self):
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        lines = [f"轮询超过 {self.budget:g} 秒仍未结束，各线程调用栈：\n"]
+        for ident, frame in sys._current_frames().items():
+            lines.append(f"\n--- {names.get(ident, ident)} ---\n")
+            lines.extend(traceback.format_stack(frame))
+        path = self._write("stacks.txt", "".join(lines))
+        if path:
+            logging.warning("轮询超时，已保存线程调用栈：%s", path)
+
+    def _save_profile(self, profiler: cProfile.Profile):
+        stream = io.StringIO()
+        pstats.Stats(profiler, stream=stream).sort_stats("cumulative").print_stats(40)
+        path = self._write("profile.txt", stream.getvalue())
+        if path:
+            profiler.dump_stats(path[: -len(".txt")] + ".prof")
+            logging.warning("已保存慢轮询性能剖析：%s", path)
+
+    def _write(self, suffix: str, content: str) -> Optional[str]:
+        try:
+            os.makedirs(self.dump_dir, exist_ok=True)
+            path = os.path.join(self.dump_dir, f"slow-cycle-{time.strftime('%Y%m%d-%H%M%S')}-{suffix}")
+            with open(path, "w", encoding="utf-8") as fp:
+                fp.write(content)
+            self._prune()
+            return path
+        except OSError:
+            logging.exception("写入慢轮询诊断文件失败")
+            return None
+
+    def _prune(self):
+        files = sorted(
+            (name for name in os.listdir(self.dump_dir) if name.startswith("slow-cycle-")),
+            reverse=True,
+        )
+        for name in files[self.keep_files:]:
+            try:
+                os.remove(os.path.join(self.dump_dir, name))
+            except OSError:
+                pass
@@ -1,59 +1,107 @@
+import json
+import os
+import threading
 import time
+from typing import Optional
+
 import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import PUSH_DURATION, PUSH_RESULTS
+from notifier import Notifier
+
+# access_token 失效或过期时企业微信返回的错误码
+TOKEN_INVALID_CODES = {40014, 42001}
+
 
-class WecomMessage:
-    def __init__(self, corpid: str, agentid: int, secret: str):
+class WecomMessage(Notifier):
+    name = "wecom"
+
+    def __init__(
+        self,
+        corpid: str,
+        agentid: int,
+        secret: str,
+        touser: str = "@all",
+        timeout: float = 10,
+        token_cache_file: Optional[str] = None,
+    ):
         """
         初始化企业微信消息发送类
         :param corpid: 企业ID
         :param agentid: 应用ID
         :param secret: 应用的Secret
+        :param touser: 默认接收人
+        :param timeout: 请求超时（秒）
+        :param token_cache_file: access_token 缓存文件，重启后仍在有效期内的令牌可直接复用
         """
         self.corpid = corpid
         self.agentid = agentid
         self.secret = secret
+        self.touser = touser
+        self.timeout = timeout
+        self.token_cache_file = token_cache_file
         self.access_token = None
         self.token_expires_time = 0
-    
-    def get_access_token(self) -> str:
+        self._token_lock = threading.Lock()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4)
+        self.session.mount("https://", adapter)
+        self._load_cached_token()
+
+    def get_access_token(self, force_refresh: bool = False) -> str:
         """
-        获取访问令牌
+        获取访问令牌，多个线程同时过期时只会刷新一次
+        :param force_refresh: 忽略缓存重新获取
         :return: access_token
         """
-        now = time.time()
-        if self.access_token and now < self.token_expires_time:
-            return self.access_token
-            
-        url = "https://qyapi.weixin.qq.com/cgi-bin/gettoken"
-        params = {
-            "corpid": self.corpid,
-            "corpsecret": self.secret
-        }
-        
-        try:
-            response = requests.get(url, params=params)
-            data = response.json()
-            
-            if data.get("errcode") == 0:
-                self.access_token = data.get("access_token")
-                self.token_expires_time = now + data.get("expires_in") - 200  # 提前200秒刷新
+        with self._token_lock:
+            now = time.time()
+            if not force_refresh and self.access_token and now < self.token_expires_time:
                 return self.access_token
-            else:
-                raise Exception(f"获取access_token失败: {data}")
-        except Exception as e:
-            print(f"获取access_token异常: {e}")
-            raise
 
-    def send_text(self, content: str, touser: str = "@all") -> bool:
+            url = "https://qyapi.weixin.qq.com/cgi-bin/gettoken"
+            params = {
+                "corpid": self.corpid,
+                "corpsecret": self.secret
+            }
+
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout)
+                data = response.json()
+
+                if data.get("errcode") == 0:
+                    self.access_token = data.get("access_token")
+                    self.token_expires_time = now + data.get("expires_in") - 200  # 提前200秒刷新
+                    self._save_cached_token()
+                    return self.access_token
+                else:
+                    raise Exception(f"获取access_token失败: {data}")
+            except Exception as e:
+                print(f"获取access_token异常: {e}")
+                raise
+
+    def send(self, title: str, body: str, url: str = "", group: str = None) -> bool:
+        parts = [f"【{group}】{title}" if group else title, body]
+        if url:
+            parts.append(url)
+        started = time.perf_counter()
+        ok = self.send_text("\n".join(part for part in parts if part))
+        PUSH_DURATION.observe(time.perf_counter() - started, channel=self.name, device=self.touser)
+        PUSH_RESULTS.inc(channel=self.name, device=self.touser, result="success" if ok else "failure")
+        return ok
+
+    def send_text(self, content: str, touser: str = None) -> bool:
         """
         发送文本消息
         :param content: 消息内容
-        :param touser: 接收人，默认为所有人
+        :param touser: 接收人，默认使用初始化时的 touser
         :return: 是否发送成功
         """
         try:
             message = {
-                "touser": touser,
+                "touser": touser or self.touser,
                 "msgtype": "text",
                 "agentid": self.agentid,
                 "text": {
@@ -62,20 +110,64 @@ class WecomMessage:
                 "enable_duplicate_check": 1,
                 "duplicate_check_interval": 1800
             }
-            
-            access_token = self.get_access_token()
-            url = f"https://qyapi.weixin.qq.com/cgi-bin/message/send?access_token={access_token}"
-            
-            response = requests.post(url, json=message)
-            result = response.json()
-            
+
+            result = self._post_message(message, self.get_access_token())
+            if result.get("errcode") in TOKEN_INVALID_CODES:
+                # 令牌被其他进程刷新或提前失效，重新获取后重试一次
+                result = self._post_message(message, self.get_access_token(force_refresh=True))
+
             if result.get("errcode") == 0:
                 print(f"企业微信消息发送成功")
                 return True
             else:
                 print(f"企业微信消息发送失败: {result}")
                 return False
-                
+
         except Exception as e:
             print(f"企业微信消息发送异常: {e}")
-            return False 
\ No newline at end of file
+            return False
+
+    def close(self):
+        self.session.close()
+
+    def _post_message(self, message: dict, access_token: str) -> dict:
+        url = f"https://qyapi.weixin.qq.com/cgi-bin/message/send?access_token={access_token}"
+        response = self.session.post(url, json=message, timeout=self.timeout)
+        return response.json()
+
+    def _cache_key(self) -> str:
+        return f"{self.corpid}:{self.agentid}"
+
+    def _load_cached_token(self):
+        if not self.token_cache_file or not os.path.exists(self.token_cache_file):
+            return
+        try:
+            with open(self.token_cache_file, "r", encoding="utf-8") as fp:
+                cached = json.load(fp).get(self._cache_key()) or {}
+        except Exception as e:
+            print(f"读取access_token缓存失败: {e}")
+            return
+        if cached.get("expires_time", 0) > time.time():
+            self.access_token = cached.get("access_token")
+            self.token_expires_time = cached["expires_time"]
+
+    def _save_cached_token(self):
+        if not self.token_cache_file:
+            return
+        try:
+            cache = {}
+            if os.path.exists(self.token_cache_file):
+                with open(self.token_cache_file, "r", encoding="utf-8") as fp:
+                    cache = json.load(fp)
+            cache[self._cache_key()] = {
+                "access_token": self.access_token,
+                "expires_time": self.token_expires_time,
+            }
+            # 先写临时文件再替换，避免进程中断留下半个文件
+            tmp_path = f"{self.token_cache_file}.tmp"
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w", encoding="utf-8") as fp:
+                json.dump(cache, fp)
+            os.replace(tmp_path, self.token_cache_file)
+        except Exception as e:
+            print(f"写入access_token缓存失败: {e}")